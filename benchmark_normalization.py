@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark the "does this name need normalizing?" check used by the Unicode
+fixers.
+
+Builds a synthetic library of names shaped like the real one (director
+folders, "YYYY - Title" film folders, video and subtitle files), where a
+small share of names carry accents in NFC or NFD form, and times:
+- before: normalize to NFC and NFD and compare, for every name
+- after:  unicode_normalize.needs_normalization (isascii, then
+          unicodedata.is_normalized), normalizing only names that need it
+
+Usage:
+    python benchmark_normalization.py
+    python benchmark_normalization.py --names 200000 --accented 0.2
+"""
+
+import argparse
+import random
+import time
+import unicodedata
+
+from unicode_normalize import needs_normalization, normalize_name
+
+ASCII_WORDS = ['The', 'Night', 'River', 'House', 'Last', 'Summer', 'Road', 'City', 'Blue',
+               'Garden', 'Stranger', 'Winter', 'Light', 'Story', 'Man', 'Woman', 'Dark']
+ACCENTED_WORDS = ['Amélie', 'Céline', 'Andrés', 'Röhr', 'Müller', 'Señora', 'Garçon', 'Été',
+                  'Noël', 'Pétalos', 'Łódź', 'Ångström', 'Crème', 'Jiří', 'Zoë']
+EXTENSIONS = ['.mkv', '.mp4', '.srt', '.en.srt', '.nfo', '.jpg']
+
+
+def synthetic_names(count, accented_share, seed=1):
+    rng = random.Random(seed)
+    names = []
+    for i in range(count):
+        words = rng.sample(ASCII_WORDS, 2)
+        if rng.random() < accented_share:
+            word = rng.choice(ACCENTED_WORDS)
+            # Half of the accented names arrive composed (Synology), half decomposed (macOS)
+            words[0] = unicodedata.normalize('NFC' if i % 2 else 'NFD', word)
+        kind = i % 3
+        if kind == 0:
+            names.append(' '.join(words))
+        elif kind == 1:
+            names.append(f"{1950 + i % 75} - {' '.join(words)}")
+        else:
+            names.append(' '.join(words) + rng.choice(EXTENSIONS))
+    return names
+
+
+def check_before(names, form):
+    found = 0
+    for name in names:
+        nfc_form = unicodedata.normalize('NFC', name)
+        nfd_form = unicodedata.normalize('NFD', name)
+        target = nfd_form if form == 'NFD' else nfc_form
+        if target != name:
+            found += 1
+    return found
+
+
+def check_after(names, form):
+    found = 0
+    for name in names:
+        if needs_normalization(name, form):
+            normalize_name(name, form)
+            found += 1
+    return found
+
+
+def run(label, func, names, form):
+    start = time.perf_counter()
+    found = func(names, form)
+    elapsed = time.perf_counter() - start
+    rate = len(names) / elapsed if elapsed > 0 else float('inf')
+    print(f"  {label:<8} {elapsed:7.3f}s  {rate:>12,.0f} names/sec  ({found} need renaming)")
+    return elapsed, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Unicode normalization scan.")
+    parser.add_argument("--names", type=int, default=1000000, help="number of names (default: 1,000,000)")
+    parser.add_argument("--accented", type=float, default=0.05,
+                        help="share of names with accents (default: 0.05)")
+    parser.add_argument("--form", choices=['NFD', 'NFC'], default='NFD', help="target form (default: NFD)")
+    args = parser.parse_args()
+
+    print(f"Generating {args.names:,} names ({args.accented:.0%} accented)...")
+    names = synthetic_names(args.names, args.accented)
+
+    print(f"Checking for names that need {args.form}:")
+    before, found_before = run("before", check_before, names, args.form)
+    after, found_after = run("after", check_after, names, args.form)
+
+    if found_before != found_after:
+        print(f"✗ Results differ: {found_before} vs {found_after}")
+    else:
+        print(f"✓ Same result, {before / after:.1f}x faster")
+
+
+if __name__ == '__main__':
+    main()
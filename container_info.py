@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Pure-Python container header reader for video resolution without subprocesses.
+
+Supports:
+- Matroska/WebM (.mkv, .webm): EBML Segment -> Info/Tracks
+- ISO BMFF (.mp4, .m4v, .mov): moov -> mvhd, trak -> hdlr/stsd (tkhd as fallback)
+- AVI (.avi): RIFF hdrl -> avih, strl -> strh/strf, odml -> dmlh
+
+Dimensions are the coded ones, as mediainfo reports them: the MP4 visual
+sample entry rather than the tkhd display size, which differs for
+anamorphic files.
+
+Files are memory-mapped and only the header structures are touched, so a
+probe costs a few page reads. read_container_info returns None for anything
+it cannot parse, in which case callers fall back to mediainfo.
+"""
+
+import mmap
+import os
+import struct
+from typing import Dict, Optional
+
+SUPPORTED_EXTENSIONS = {'.mkv', '.webm', '.mp4', '.m4v', '.mov', '.avi'}
+
+# Container codec ids -> the format names mediainfo reports
+CODEC_NAMES = {
+    'V_MPEG4/ISO/AVC': 'AVC', 'avc1': 'AVC', 'avc3': 'AVC', 'H264': 'AVC', 'h264': 'AVC',
+    'V_MPEGH/ISO/HEVC': 'HEVC', 'hvc1': 'HEVC', 'hev1': 'HEVC',
+    'V_AV1': 'AV1', 'av01': 'AV1',
+    'V_VP8': 'VP8', 'V_VP9': 'VP9', 'vp09': 'VP9',
+    'V_MPEG2': 'MPEG Video', 'V_MPEG4/ISO/ASP': 'MPEG-4 Visual', 'mp4v': 'MPEG-4 Visual',
+    'XVID': 'MPEG-4 Visual', 'xvid': 'MPEG-4 Visual', 'DIVX': 'MPEG-4 Visual',
+    'DX50': 'MPEG-4 Visual', 'FMP4': 'MPEG-4 Visual',
+}
+
+# Matroska element ids
+_EBML = 0x1A45DFA3
+_SEGMENT = 0x18538067
+_INFO = 0x1549A966
+_TIMECODE_SCALE = 0x2AD7B1
+_DURATION = 0x4489
+_TRACKS = 0x1654AE6B
+_TRACK_ENTRY = 0xAE
+_TRACK_TYPE = 0x83
+_CODEC_ID = 0x86
+_VIDEO = 0xE0
+_PIXEL_WIDTH = 0xB0
+_PIXEL_HEIGHT = 0xBA
+_CLUSTER = 0x1F43B675
+
+
+def _result(width: int, height: int, duration: float, codec: str) -> Optional[Dict]:
+    if not width or not height:
+        return None
+    return {
+        'resolution': height,
+        'width': width,
+        'height': height,
+        'duration': round(duration, 3),
+        'codec': CODEC_NAMES.get(codec, codec),
+    }
+
+
+# --- Matroska ---------------------------------------------------------------
+
+def _read_vint(buf, pos: int, keep_marker: bool):
+    first = buf[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("invalid EBML vint")
+    value = first if keep_marker else first & (mask - 1)
+    all_ones = (first & (mask - 1)) == mask - 1
+    for b in buf[pos + 1:pos + length]:
+        value = (value << 8) | b
+        all_ones = all_ones and b == 0xFF
+    if all_ones and not keep_marker:
+        value = None  # unknown size
+    return value, pos + length
+
+
+def _ebml_elements(buf, start: int, end: int):
+    pos = start
+    while pos < end:
+        element_id, pos = _read_vint(buf, pos, keep_marker=True)
+        size, pos = _read_vint(buf, pos, keep_marker=False)
+        data_end = end if size is None else min(pos + size, end)
+        yield element_id, pos, data_end, size is None
+        pos = data_end
+
+
+def _ebml_uint(buf, start, end) -> int:
+    return int.from_bytes(buf[start:end], 'big')
+
+
+def _parse_mkv(buf) -> Optional[Dict]:
+    timecode_scale = 1000000
+    duration = 0.0
+    width = height = 0
+    codec = ''
+    size = len(buf)
+
+    for element_id, start, end, _ in _ebml_elements(buf, 0, size):
+        if element_id != _SEGMENT:
+            continue
+        for child_id, c_start, c_end, unknown in _ebml_elements(buf, start, end):
+            if child_id == _INFO:
+                for info_id, i_start, i_end, _ in _ebml_elements(buf, c_start, c_end):
+                    if info_id == _TIMECODE_SCALE:
+                        timecode_scale = _ebml_uint(buf, i_start, i_end)
+                    elif info_id == _DURATION:
+                        fmt = '>f' if i_end - i_start == 4 else '>d'
+                        duration = struct.unpack(fmt, buf[i_start:i_end])[0]
+            elif child_id == _TRACKS:
+                for entry_id, e_start, e_end, _ in _ebml_elements(buf, c_start, c_end):
+                    if entry_id != _TRACK_ENTRY or width:
+                        continue
+                    track_type, track_codec, dims = 0, '', (0, 0)
+                    for field_id, f_start, f_end, _ in _ebml_elements(buf, e_start, e_end):
+                        if field_id == _TRACK_TYPE:
+                            track_type = _ebml_uint(buf, f_start, f_end)
+                        elif field_id == _CODEC_ID:
+                            track_codec = bytes(buf[f_start:f_end]).rstrip(b'\0').decode('ascii', 'replace')
+                        elif field_id == _VIDEO:
+                            w = h = 0
+                            for v_id, v_start, v_end, _ in _ebml_elements(buf, f_start, f_end):
+                                if v_id == _PIXEL_WIDTH:
+                                    w = _ebml_uint(buf, v_start, v_end)
+                                elif v_id == _PIXEL_HEIGHT:
+                                    h = _ebml_uint(buf, v_start, v_end)
+                            dims = (w, h)
+                    if track_type == 1:
+                        width, height = dims
+                        codec = track_codec
+            elif child_id == _CLUSTER or unknown:
+                break  # media data starts; all headers we need come before it
+            if width and duration:
+                break
+        break
+
+    return _result(width, height, duration * timecode_scale / 1e9, codec)
+
+
+# --- ISO BMFF ---------------------------------------------------------------
+
+def _boxes(buf, start: int, end: int):
+    pos = start
+    while pos + 8 <= end:
+        size, box_type = struct.unpack('>I4s', buf[pos:pos + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', buf[pos + 8:pos + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield box_type, pos + header, min(pos + size, end)
+        pos += size
+
+
+def _find_box(buf, start, end, box_type):
+    for found, b_start, b_end in _boxes(buf, start, end):
+        if found == box_type:
+            return b_start, b_end
+    return None
+
+
+def _parse_mp4(buf) -> Optional[Dict]:
+    moov = _find_box(buf, 0, len(buf), b'moov')
+    if not moov:
+        return None
+    duration = 0.0
+    width = height = 0
+    codec = ''
+
+    mvhd = _find_box(buf, moov[0], moov[1], b'mvhd')
+    if mvhd:
+        start = mvhd[0]
+        if buf[start] == 1:
+            timescale, length = struct.unpack('>IQ', buf[start + 20:start + 32])
+        else:
+            timescale, length = struct.unpack('>II', buf[start + 12:start + 20])
+        if timescale:
+            duration = length / timescale
+
+    for box_type, t_start, t_end in _boxes(buf, moov[0], moov[1]):
+        if box_type != b'trak':
+            continue
+        mdia = _find_box(buf, t_start, t_end, b'mdia')
+        hdlr = mdia and _find_box(buf, mdia[0], mdia[1], b'hdlr')
+        if not hdlr or bytes(buf[hdlr[0] + 8:hdlr[0] + 12]) != b'vide':
+            continue
+
+        minf = _find_box(buf, mdia[0], mdia[1], b'minf')
+        stbl = minf and _find_box(buf, minf[0], minf[1], b'stbl')
+        stsd = stbl and _find_box(buf, stbl[0], stbl[1], b'stsd')
+        if stsd:
+            entry = stsd[0] + 8  # version/flags + entry_count
+            codec = bytes(buf[entry + 4:entry + 8]).decode('ascii', 'replace')
+            # VisualSampleEntry: coded width/height after the 24-byte sample entry header
+            width, height = struct.unpack('>HH', buf[entry + 32:entry + 36])
+
+        tkhd = _find_box(buf, t_start, t_end, b'tkhd')
+        if tkhd and (not width or not height):
+            # display width/height are the last two 16.16 fixed-point fields
+            w, h = struct.unpack('>II', buf[tkhd[1] - 8:tkhd[1]])
+            width, height = w >> 16, h >> 16
+        break
+
+    return _result(width, height, duration, codec)
+
+
+# --- AVI --------------------------------------------------------------------
+
+def _riff_chunks(buf, start: int, end: int):
+    pos = start
+    while pos + 8 <= end:
+        chunk_id, size = struct.unpack('<4sI', buf[pos:pos + 8])
+        data_start = pos + 8
+        yield chunk_id, data_start, min(data_start + size, end)
+        pos = data_start + size + (size & 1)
+
+
+def _parse_avi(buf) -> Optional[Dict]:
+    if bytes(buf[0:4]) != b'RIFF' or bytes(buf[8:12]) != b'AVI ':
+        return None
+    width = height = 0
+    usec_per_frame = total_frames = 0
+    codec = ''
+
+    for chunk_id, start, end in _riff_chunks(buf, 12, len(buf)):
+        if chunk_id != b'LIST' or bytes(buf[start:start + 4]) != b'hdrl':
+            continue
+        for sub_id, s_start, s_end in _riff_chunks(buf, start + 4, end):
+            if sub_id == b'avih':
+                usec_per_frame, = struct.unpack('<I', buf[s_start:s_start + 4])
+                total_frames = max(total_frames, struct.unpack('<I', buf[s_start + 16:s_start + 20])[0])
+                width, height = struct.unpack('<II', buf[s_start + 32:s_start + 40])
+            elif sub_id == b'LIST' and bytes(buf[s_start:s_start + 4]) == b'odml':
+                # OpenDML (> 1 GB) files: avih only counts the frames of the first RIFF chunk
+                for odml_id, o_start, o_end in _riff_chunks(buf, s_start + 4, s_end):
+                    if odml_id == b'dmlh':
+                        total_frames = max(total_frames, struct.unpack('<I', buf[o_start:o_start + 4])[0])
+            elif sub_id == b'LIST' and bytes(buf[s_start:s_start + 4]) == b'strl' and not codec:
+                is_video = False
+                for strl_id, l_start, l_end in _riff_chunks(buf, s_start + 4, s_end):
+                    if strl_id == b'strh' and bytes(buf[l_start:l_start + 4]) == b'vids':
+                        is_video = True
+                        codec = bytes(buf[l_start + 4:l_start + 8]).decode('ascii', 'replace').strip('\0 ')
+                    elif strl_id == b'strf' and is_video:
+                        # BITMAPINFOHEADER: biCompression is the reliable fourcc
+                        compression = bytes(buf[l_start + 16:l_start + 20]).decode('ascii', 'replace').strip('\0 ')
+                        if compression:
+                            codec = compression
+                        if not width or not height:
+                            w, h = struct.unpack('<ii', buf[l_start + 4:l_start + 12])
+                            width, height = w, abs(h)
+        break  # hdrl is the first list; movi data follows
+
+    return _result(width, height, total_frames * usec_per_frame / 1e6, codec)
+
+
+_PARSERS = {
+    '.mkv': _parse_mkv, '.webm': _parse_mkv,
+    '.mp4': _parse_mp4, '.m4v': _parse_mp4, '.mov': _parse_mp4,
+    '.avi': _parse_avi,
+}
+
+
+def read_container_info(path: str) -> Optional[Dict]:
+    """
+    Read width/height/duration/codec from the container headers of path.
+
+    Returns a dict shaped like media_probe results (minus size), or None if
+    the format is unsupported or the headers cannot be parsed.
+    """
+    parser = _PARSERS.get(os.path.splitext(path)[1].lower())
+    if parser is None:
+        return None
+    try:
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                return parser(buf)
+    except (OSError, ValueError, IndexError, struct.error):
+        return None
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Cross-device aware copy engine shared by the organizer scripts.
+
+- Moves are a plain rename when source and destination are on the same
+  device (same st_dev).
+- Otherwise data is streamed with kernel copy offload (os.copy_file_range,
+  then os.sendfile) and falls back to a large-buffer read/write loop where
+  the platform does not support either (e.g. macOS).
+- Permissions and timestamps are preserved with shutil.copystat.
+- Every operation can record files/bytes/seconds into a stats dict so
+  callers can report throughput.
+- merge_tree merges one directory into another by rename, resolving name
+  conflicts in memory from a single listing per directory.
+- A Throttle can be shared by concurrent copies to cap their combined
+  bytes/sec.
+- copy_tree can hard-link files that are unchanged in a previous copy
+  (link_dest, like rsync --link-dest) instead of copying them again.
+"""
+
+import errno
+import os
+import shutil
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional, Set
+
+from file_hash import partial_hash
+
+COPY_BUFFER_SIZE = 8 * 1024 * 1024  # 8 MiB per read/write or offload call
+MTIME_TOLERANCE = 2  # seconds; exFAT/SMB store modification times coarsely
+
+# Errors meaning "this offload call is not usable here", not a real I/O failure
+_OFFLOAD_UNSUPPORTED = {
+    errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+    errno.ENOTSUP, errno.EBADF, errno.ENOTSOCK, errno.EPERM,
+}
+
+
+def new_stats() -> Dict:
+    """Return an empty stats dict for copy/move operations."""
+    return {'files': 0, 'bytes': 0, 'seconds': 0.0, 'renamed': 0, 'skipped': 0, 'linked': 0}
+
+
+def add_stats(total: Dict, other: Dict) -> Dict:
+    """Accumulate the counters of other into total."""
+    for key in total:
+        total[key] += other.get(key, 0)
+    return total
+
+
+def format_size(num_bytes: float) -> str:
+    size = float(num_bytes)
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def format_rate(stats: Dict) -> str:
+    """Human readable summary of a stats dict, e.g. '1.2 GB in 10.0s (120.0 MB/s)'."""
+    seconds = stats['seconds']
+    rate = stats['bytes'] / seconds if seconds > 0 else 0
+    text = f"{format_size(stats['bytes'])} in {seconds:.1f}s ({format_size(rate)}/s)"
+    if stats.get('renamed'):
+        text += f", {stats['renamed']} renamed in place"
+    if stats.get('skipped'):
+        text += f", {stats['skipped']} unchanged skipped"
+    if stats.get('linked'):
+        text += f", {stats['linked']} hard-linked"
+    return text
+
+
+class Throttle:
+    """Bytes/sec limit shared by any number of copying threads."""
+
+    def __init__(self, bytes_per_sec: float):
+        self.bytes_per_sec = bytes_per_sec
+        self._lock = threading.Lock()
+        self._next_free = time.monotonic()
+
+    def consume(self, num_bytes: int):
+        """Account for num_bytes just transferred, sleeping to stay under the limit."""
+        if self.bytes_per_sec <= 0 or num_bytes <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._next_free = max(self._next_free, now) + num_bytes / self.bytes_per_sec
+            delay = self._next_free - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+def measure_write_throughput(directory: str, sample_size: int = 64 * 1024 * 1024) -> float:
+    """
+    Write and fsync a temporary sample file in directory and return bytes/sec.
+
+    Gives a rough figure for how fast data can be written to that volume.
+    """
+    path = os.path.join(directory, f".throughput_probe_{os.getpid()}")
+    chunk = os.urandom(min(COPY_BUFFER_SIZE, sample_size))
+    start = time.monotonic()
+    try:
+        with open(path, 'wb', buffering=0) as f:
+            written = 0
+            while written < sample_size:
+                written += f.write(chunk[:sample_size - written])
+            os.fsync(f.fileno())
+        elapsed = time.monotonic() - start
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return written / elapsed if elapsed > 0 else 0.0
+
+
+def device_of(path: str) -> int:
+    """st_dev of path, or of its nearest existing parent if it does not exist yet."""
+    path = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(path).st_dev
+        except FileNotFoundError:
+            parent = os.path.dirname(path)
+            if parent == path:
+                raise
+            path = parent
+
+
+def same_device(src: str, dst: str) -> bool:
+    """True when a rename from src to dst can succeed without copying data."""
+    try:
+        return device_of(src) == device_of(dst)
+    except OSError:
+        return False
+
+
+def _copy_offload(copy_call, fd_in: int, fd_out: int, offset: int, size: int,
+                  buffer_size: int, throttle: Optional[Throttle] = None) -> int:
+    """
+    Run an offload call until size is reached or the call stops being usable
+    here. Returns the new offset, so the next method continues from it.
+    """
+    while offset < size:
+        try:
+            sent = copy_call(fd_in, fd_out, offset, min(buffer_size, size - offset))
+        except OSError as e:
+            if e.errno not in _OFFLOAD_UNSUPPORTED:
+                raise
+            break
+        if sent == 0:
+            break
+        offset += sent
+        if throttle is not None:
+            throttle.consume(sent)
+    return offset
+
+
+def _copy_range(fd_in, fd_out, offset, count):
+    return os.copy_file_range(fd_in, fd_out, count, offset, offset)
+
+
+def _sendfile(fd_in, fd_out, offset, count):
+    return os.sendfile(fd_out, fd_in, offset, count)
+
+
+def _copy_data(fd_in: int, fd_out: int, size: int, buffer_size: int,
+               throttle: Optional[Throttle] = None) -> int:
+    """Copy size bytes between open descriptors, fastest method first."""
+    offset = 0
+    for name, call in (('copy_file_range', _copy_range), ('sendfile', _sendfile)):
+        if not hasattr(os, name) or offset >= size:
+            continue
+        # copy_file_range uses explicit offsets and leaves fd_out's position
+        # untouched; sendfile writes at that position, so line it up first
+        os.lseek(fd_out, offset, os.SEEK_SET)
+        offset = _copy_offload(call, fd_in, fd_out, offset, size, buffer_size, throttle)
+        if offset >= size:
+            return offset
+
+    # Plain buffered loop (also picks up files that grew while copying)
+    os.lseek(fd_in, offset, os.SEEK_SET)
+    os.lseek(fd_out, offset, os.SEEK_SET)
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+    while True:
+        n = os.readv(fd_in, [buf])
+        if n == 0:
+            break
+        written = 0
+        while written < n:
+            written += os.write(fd_out, view[written:n])
+        offset += n
+        if throttle is not None:
+            throttle.consume(n)
+    return offset
+
+
+def is_unchanged(src: str, dst: str) -> bool:
+    """True when dst exists with the same size and (within tolerance) mtime as src."""
+    try:
+        src_stat = os.stat(src)
+        dst_stat = os.stat(dst)
+    except OSError:
+        return False
+    return (src_stat.st_size == dst_stat.st_size
+            and abs(src_stat.st_mtime - dst_stat.st_mtime) <= MTIME_TOLERANCE)
+
+
+def link_unchanged(src: str, dst: str, previous: str, compare_hash: bool = False,
+                   stats: Optional[Dict] = None) -> bool:
+    """
+    Hard-link previous to dst if it is an unchanged copy of src.
+
+    Unchanged means same size and mtime, plus the same partial hash when
+    compare_hash is set. Returns False (nothing done) when previous differs
+    or the volume cannot hard-link, so the caller copies instead.
+    """
+    if not is_unchanged(src, previous):
+        return False
+    try:
+        if compare_hash and partial_hash(src) != partial_hash(previous):
+            return False
+        dst_dir, dst_name = os.path.split(dst)
+        tmp_path = os.path.join(dst_dir, f".{dst_name}.partial")
+        if os.path.lexists(tmp_path):
+            os.remove(tmp_path)
+        os.link(previous, tmp_path)
+        os.replace(tmp_path, dst)
+    except OSError:
+        return False
+    if stats is not None:
+        stats['linked'] += 1
+    return True
+
+
+def copy_file(src: str, dst: str, buffer_size: int = COPY_BUFFER_SIZE,
+              stats: Optional[Dict] = None, throttle: Optional[Throttle] = None) -> int:
+    """
+    Copy a single file with its metadata and return the number of bytes copied.
+
+    Data is written to a temporary ".partial" name next to dst and renamed into
+    place once complete, so an interrupted copy never looks like a finished one.
+    """
+    start = time.monotonic()
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    dst_dir, dst_name = os.path.split(dst)
+    tmp_path = os.path.join(dst_dir, f".{dst_name}.partial")
+
+    with open(src, 'rb') as fsrc:
+        size = os.fstat(fsrc.fileno()).st_size
+        try:
+            with open(tmp_path, 'wb') as fdst:
+                copied = _copy_data(fsrc.fileno(), fdst.fileno(), size, buffer_size, throttle)
+            shutil.copystat(src, tmp_path)
+            os.replace(tmp_path, dst)
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    if stats is not None:
+        stats['files'] += 1
+        stats['bytes'] += copied
+        stats['seconds'] += time.monotonic() - start
+    return copied
+
+
+def move_file(src: str, dst: str, stats: Optional[Dict] = None) -> str:
+    """
+    Move a file, renaming when possible and copying across devices.
+
+    Returns 'renamed' or 'copied'.
+    """
+    if os.path.isdir(dst):
+        dst = os.path.join(dst, os.path.basename(src))
+    if same_device(src, dst):
+        try:
+            os.rename(src, dst)
+            if stats is not None:
+                stats['renamed'] += 1
+            return 'renamed'
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    copy_file(src, dst, stats=stats)
+    os.remove(src)
+    return 'copied'
+
+
+def copy_tree(src: str, dst: str, stats: Optional[Dict] = None,
+              skip_unchanged: bool = False, throttle: Optional[Throttle] = None,
+              link_dest: Optional[str] = None, compare_hash: bool = False) -> str:
+    """
+    Copy a directory tree into dst (merging with existing content).
+
+    With skip_unchanged, files already present in dst with the same size and
+    mtime are left alone, so an interrupted copy can be resumed cheaply.
+    With link_dest, files unchanged in that earlier copy of src are
+    hard-linked from it instead of copied (see link_unchanged).
+    """
+    def _copy(s, d):
+        if skip_unchanged and is_unchanged(s, d):
+            if stats is not None:
+                stats['skipped'] += 1
+            return d
+        if link_dest is not None:
+            previous = os.path.join(link_dest, os.path.relpath(d, dst))
+            if link_unchanged(s, d, previous, compare_hash, stats):
+                return d
+        copy_file(s, d, stats=stats, throttle=throttle)
+        return d
+
+    return shutil.copytree(src, dst, copy_function=_copy, dirs_exist_ok=True)
+
+
+def move_tree(src: str, dst: str, stats: Optional[Dict] = None) -> str:
+    """
+    Move a file or directory tree to dst, which must not exist yet.
+
+    Same device: a single rename. Otherwise the tree is copied with
+    copy_file and the source removed afterwards.
+    """
+    if not os.path.isdir(src):
+        return move_file(src, dst, stats=stats)
+    if same_device(src, dst):
+        try:
+            os.rename(src, dst)
+            if stats is not None:
+                stats['renamed'] += 1
+            return 'renamed'
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    copy_tree(src, dst, stats=stats)
+    shutil.rmtree(src)
+    return 'copied'
+
+
+def name_key(name: str) -> str:
+    """
+    Key used to detect name conflicts in memory.
+
+    Conservative on purpose: macOS volumes are usually case- and
+    normalization-insensitive, so "Film.srt", "film.srt" and NFC/NFD twins
+    are treated as the same name and never silently overwrite each other.
+    """
+    return unicodedata.normalize('NFD', name).casefold()
+
+
+def unique_name(name: str, taken: Set[str]) -> str:
+    """Return name, or 'name (duplicate N).ext' if its key is already in taken."""
+    base, ext = os.path.splitext(name)
+    counter = 1
+    candidate = name
+    while name_key(candidate) in taken:
+        candidate = f"{base} (duplicate {counter}){ext}"
+        counter += 1
+    return candidate
+
+
+def merge_tree(src: str, dst: str, conflict: str = 'duplicate', dry_run: bool = False,
+               include_hidden: bool = True, stats: Optional[Dict] = None) -> Dict:
+    """
+    Merge directory src into dst by moving entries, then remove src if empty.
+
+    Entries missing from dst are moved whole (one rename on the same device),
+    directories present on both sides are merged recursively. Each destination
+    directory is listed once with os.scandir and conflicts are resolved against
+    that in-memory name set, so no per-file existence probes are issued.
+
+    conflict decides what happens when a file already exists at dst:
+      'duplicate' - move it as "name (duplicate N).ext"
+      'replace'   - overwrite the destination file
+      'skip'      - leave it in src
+
+    Returns a summary dict with moved/merged/duplicates/replaced/skipped counts.
+    """
+    summary = {'moved': 0, 'merged': 0, 'duplicates': 0, 'replaced': 0, 'skipped': []}
+    if stats is None:
+        stats = new_stats()
+    _merge(src, dst, conflict, dry_run, include_hidden, same_device(src, dst), stats, summary)
+    return summary
+
+
+def _move_entry(src: str, dst: str, is_dir: bool, rename_ok: bool, dry_run: bool,
+                stats: Dict, replace: bool = False):
+    if dry_run:
+        print(f"[DRY] move {'dir' if is_dir else 'file'}: {src} -> {dst}")
+        return
+    if rename_ok:
+        try:
+            (os.replace if replace else os.rename)(src, dst)
+            stats['renamed'] += 1
+            return
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    if is_dir:
+        move_tree(src, dst, stats=stats)
+    else:
+        copy_file(src, dst, stats=stats)
+        os.remove(src)
+
+
+def _merge(src, dst, conflict, dry_run, include_hidden, rename_ok, stats, summary):
+    if not os.path.isdir(dst):
+        _move_entry(src, dst, True, rename_ok, dry_run, stats)
+        summary['moved'] += 1
+        return
+
+    summary['merged'] += 1
+    existing = {}
+    with os.scandir(dst) as it:
+        for entry in it:
+            existing[name_key(entry.name)] = (entry.name, entry.is_dir())
+    taken = set(existing)
+
+    with os.scandir(src) as it:
+        entries = [(e.name, e.path, e.is_dir()) for e in it]
+
+    for name, src_path, is_dir in entries:
+        if not include_hidden and name.startswith('.'):
+            continue
+        match = existing.get(name_key(name))
+        if match is None:
+            _move_entry(src_path, os.path.join(dst, name), is_dir, rename_ok, dry_run, stats)
+            taken.add(name_key(name))
+            summary['moved'] += 1
+            continue
+
+        dst_name, dst_is_dir = match
+        dst_path = os.path.join(dst, dst_name)
+        if is_dir and dst_is_dir:
+            _merge(src_path, dst_path, conflict, dry_run, include_hidden, rename_ok, stats, summary)
+        elif conflict == 'replace' and not is_dir and not dst_is_dir:
+            _move_entry(src_path, dst_path, False, rename_ok, dry_run, stats, replace=True)
+            summary['replaced'] += 1
+        elif conflict == 'skip':
+            summary['skipped'].append(src_path)
+        else:
+            final_name = unique_name(name, taken)
+            _move_entry(src_path, os.path.join(dst, final_name), is_dir, rename_ok, dry_run, stats)
+            taken.add(name_key(final_name))
+            summary['duplicates'] += 1
+
+    if dry_run:
+        print(f"[DRY] rmdir: {src}")
+        return
+    try:
+        os.rmdir(src)
+    except OSError:
+        pass  # non-empty (skipped/hidden entries) or permission issues
@@ -2,13 +2,33 @@
 """
 Diagnose and attempt to fix filesystem issues with /Volumes/Films/AJ
 This appears to be a unicode normalization or filesystem corruption problem.
+
+--profile stats and lists every entry with a pool of worker threads, each
+operation under a timeout, and reports a latency histogram plus the slowest,
+hung and erroring paths (also saved to ~/Desktop/AJ_latency_profile.json).
+A hung entry only costs one worker, which is replaced.
+
+Usage:
+    python diagnose_and_fix_filesystem.py
+    python diagnose_and_fix_filesystem.py --profile [--workers N] [--timeout SECONDS] [--depth N]
 """
 
+import argparse
+import json
 import os
+import queue
+import stat
 import subprocess
 import sys
+import threading
+import time
 
 AJ_PATH = "/Volumes/Films/AJ"
+PROFILE_WORKERS = 16
+PROFILE_TIMEOUT = 10  # seconds before an operation counts as hung
+PROFILE_REPORT = os.path.expanduser("~/Desktop/AJ_latency_profile.json")
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = [0.001, 0.01, 0.1, 1, 10]
 
 def diagnose_volume():
     """Run diagnostics on the volume"""
@@ -64,6 +84,178 @@ def diagnose_volume():
         print(f"  ✗ Error: {e}")
         return False
 
+class _Abandoned(Exception):
+    """Raised in a worker whose operation was declared hung."""
+
+def _list_entries(path):
+    with os.scandir(path) as it:
+        return [entry.path for entry in it]
+
+def profile_entries(root, workers=PROFILE_WORKERS, timeout=PROFILE_TIMEOUT, depth=1):
+    """
+    Time lstat (and scandir for directories) of every entry below root, down
+    to `depth` levels.
+    
+    Returns a list of records: {path, latencies: {op: seconds}, error, hung}.
+    """
+    tasks = queue.Queue()
+    lock = threading.Lock()
+    in_flight = {}  # worker id -> (path, op, start)
+    records = []
+    pending = [0]  # entries queued but not yet recorded
+    
+    def enqueue(path, level):
+        with lock:
+            pending[0] += 1
+        tasks.put((path, level))
+    
+    def timed(worker_id, path, op, func):
+        with lock:
+            in_flight[worker_id] = (path, op, time.monotonic())
+        start = time.monotonic()
+        try:
+            return func(path), time.monotonic() - start, None
+        except OSError as e:
+            return None, time.monotonic() - start, e
+        finally:
+            with lock:
+                # If the monitor already declared this operation hung, it owns the record
+                abandoned = in_flight.pop(worker_id, None) is None
+            if abandoned:
+                raise _Abandoned()
+    
+    def worker(worker_id):
+        while True:
+            try:
+                path, level = tasks.get(timeout=0.2)
+            except queue.Empty:
+                with lock:
+                    if pending[0] == 0:
+                        return
+                continue
+            try:
+                record = {'path': path, 'latencies': {}, 'error': None, 'hung': None}
+                st, record['latencies']['lstat'], error = timed(worker_id, path, 'lstat', os.lstat)
+                if error is None and stat.S_ISDIR(st.st_mode):
+                    children, record['latencies']['scandir'], error = timed(
+                        worker_id, path, 'scandir', _list_entries)
+                    if children and level < depth:
+                        for child in children:
+                            enqueue(child, level + 1)
+                elif error is None and not stat.S_ISREG(st.st_mode) and not stat.S_ISLNK(st.st_mode):
+                    error = "neither file nor directory"
+                if error is not None:
+                    record['error'] = str(error)
+                with lock:
+                    records.append(record)
+                    pending[0] -= 1
+            except _Abandoned:
+                return  # a replacement worker has taken over
+    
+    def start_worker():
+        worker_id = object()
+        threading.Thread(target=worker, args=(worker_id,), daemon=True).start()
+    
+    for path in _list_entries(root):
+        enqueue(path, 1)
+    for _ in range(max(1, workers)):
+        start_worker()
+    
+    last_report = time.monotonic()
+    while True:
+        time.sleep(0.1)
+        now = time.monotonic()
+        with lock:
+            if pending[0] == 0:
+                break
+            hung = [(worker_id, info) for worker_id, info in in_flight.items() if now - info[2] > timeout]
+            for worker_id, (path, op, start) in hung:
+                del in_flight[worker_id]
+                records.append({'path': path, 'latencies': {op: now - start}, 'error': None, 'hung': op})
+                pending[0] -= 1
+            done, remaining = len(records), pending[0]
+        for _ in hung:
+            start_worker()
+        if now - last_report > 2:
+            print(f"\r  {done} checked, {remaining} pending...", end='', flush=True)
+            last_report = now
+    print()
+    return records
+
+def latency_histogram(records):
+    """Counts of operations per latency bucket"""
+    labels = [f"< {bound * 1000:g} ms" if bound < 1 else f"< {bound:g} s" for bound in LATENCY_BUCKETS]
+    labels.append(f">= {LATENCY_BUCKETS[-1]:g} s")
+    counts = [0] * len(labels)
+    for record in records:
+        if record['hung']:
+            continue
+        for seconds in record['latencies'].values():
+            index = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds < bound), len(LATENCY_BUCKETS))
+            counts[index] += 1
+    return list(zip(labels, counts))
+
+def profile_volume(root=AJ_PATH, workers=PROFILE_WORKERS, timeout=PROFILE_TIMEOUT, depth=1):
+    """Latency-profile a share and report slow, hung and erroring paths"""
+    print("="*60)
+    print("LATENCY PROFILE")
+    print("="*60)
+    print(f"Path: {root}")
+    print(f"Workers: {workers}, timeout: {timeout}s per operation, depth: {depth}\n")
+    
+    start = time.monotonic()
+    try:
+        records = profile_entries(root, workers, timeout, depth)
+    except OSError as e:
+        print(f"✗ Cannot list {root}: {e}")
+        return False
+    elapsed = time.monotonic() - start
+    
+    hung = [r for r in records if r['hung']]
+    errors = [r for r in records if r['error']]
+    timed = [r for r in records if not r['hung']]
+    slowest = sorted(timed, key=lambda r: max(r['latencies'].values(), default=0), reverse=True)[:20]
+    histogram = latency_histogram(records)
+    
+    print(f"Checked {len(records)} entries in {elapsed:.1f}s")
+    print("\nLatency histogram (per operation):")
+    largest = max((count for _, count in histogram), default=0) or 1
+    for label, count in histogram:
+        print(f"  {label:>10}  {count:>7}  {'#' * round(40 * count / largest)}")
+    
+    if slowest:
+        print("\nSlowest entries:")
+        for record in slowest:
+            ops = ", ".join(f"{op} {seconds * 1000:.0f} ms" for op, seconds in record['latencies'].items())
+            print(f"  {record['path']}  ({ops})")
+    if hung:
+        print(f"\n✗ Hung entries (no answer within {timeout}s):")
+        for record in hung:
+            print(f"  {record['path']}  ({record['hung']})")
+    if errors:
+        print("\n✗ Entries with errors:")
+        for record in errors:
+            print(f"  {record['path']}: {record['error']}")
+    if not hung and not errors:
+        print("\n✓ No hung or failing entries")
+    
+    report = {
+        'root': root,
+        'checked': len(records),
+        'seconds': round(elapsed, 1),
+        'histogram': dict(histogram),
+        'slowest': slowest,
+        'hung': hung,
+        'errors': errors,
+    }
+    try:
+        with open(PROFILE_REPORT, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\nReport saved to: {PROFILE_REPORT}")
+    except OSError as e:
+        print(f"\n⚠ Could not save report: {e}")
+    return not hung and not errors
+
 def suggest_fixes():
     """Suggest potential fixes"""
     print("\n" + "="*60)
@@ -132,6 +324,22 @@ def attempt_emergency_backup_list():
         print(f"✗ Error creating backup list: {e}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diagnose filesystem issues with /Volumes/Films/AJ")
+    parser.add_argument("--profile", action="store_true",
+                        help="latency-profile every entry with a worker pool and per-operation timeouts")
+    parser.add_argument("--path", default=AJ_PATH, help=f"folder to profile (default: {AJ_PATH})")
+    parser.add_argument("--workers", type=int, default=PROFILE_WORKERS,
+                        help=f"concurrent operations (default: {PROFILE_WORKERS})")
+    parser.add_argument("--timeout", type=float, default=PROFILE_TIMEOUT,
+                        help=f"seconds before an operation counts as hung (default: {PROFILE_TIMEOUT})")
+    parser.add_argument("--depth", type=int, default=1,
+                        help="levels to profile; 1 = top-level entries only (default: 1)")
+    args = parser.parse_args()
+    
+    if args.profile:
+        ok = profile_volume(args.path, workers=args.workers, timeout=args.timeout, depth=args.depth)
+        sys.exit(0 if ok else 1)
+    
     diagnose_volume()
     suggest_fixes()
     
@@ -2,39 +2,549 @@
 """
 Emergency backup of /Volumes/Films/AJ to /Volumes/AJ8
 Only copies accessible directories (skips corrupted entries)
+
+With --resume, the most recent unfinished AJ_BACKUP_* folder is reused:
+top-level folders recorded in its checkpoint are skipped, and files already
+copied with the same size/mtime are not copied again. A backup only counts
+as finished once every top-level entry was copied without failures, so a
+run cut short by a NAS disconnect can always be resumed.
+
+Top-level entries are copied by a pool of --workers threads, optionally
+capped at a combined --limit MB/s; output is still printed in folder order.
+
+Before asking for confirmation the source is sized with a parallel scandir
+walk (a snapshot younger than 6 hours is reused unless --rescan is given),
+the backup is refused if it does not fit, and the duration is estimated from
+a short write sample on the destination.
+
+With --snapshot, files unchanged since the previous finished backup (same
+size/mtime, plus the same partial hash with --verify-hash) are hard-linked
+from it instead of copied, so each backup only costs the changed bytes.
+--prune N deletes all but the newest N backups.
+
+Files are copied one by one with bounded retries and a size-based timeout
+(based on each worker's share of --limit when one is set), so an unreadable
+file only loses that file; a copy that timed out stops at its next chunk. Failing paths (including
+top-level entries that could not be accessed at all) are appended to
+.backup_errors.jsonl in the backup folder; --retry-failed re-attempts just
+those paths in the newest backup that has any.
+
+Usage:
+    python emergency_backup_to_aj8.py [--resume] [--workers N] [--limit MB_PER_SEC] [--rescan]
+                                      [--snapshot [--verify-hash]]
+    python emergency_backup_to_aj8.py --retry-failed [--workers N] [--limit MB_PER_SEC]
+    python emergency_backup_to_aj8.py --prune N
 """
 
+import argparse
+import glob
+import json
 import os
 import shutil
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from copy_engine import (Throttle, copy_file, is_unchanged, link_unchanged, new_stats,
+                         add_stats, format_rate, format_size, measure_write_throughput)
 
 SOURCE = "/Volumes/Films/AJ"
-DESTINATION = "/Volumes/AJ8/AJ_BACKUP_" + datetime.now().strftime("%Y%m%d_%H%M%S")
+BACKUP_VOLUME = "/Volumes/AJ8"
+BACKUP_PREFIX = "AJ_BACKUP_"
+CHECKPOINT_NAME = ".backup_checkpoint.json"
+ERROR_LOG_NAME = ".backup_errors.jsonl"
+FILE_ATTEMPTS = 3  # tries per file before it is logged as failed
+RETRY_DELAY = 2  # seconds, multiplied by the attempt number
+FILE_TIMEOUT = 60  # seconds allowed per file on top of the size-based allowance
+FILE_TIMEOUT_MIN_RATE = 1024 * 1024  # bytes/sec below which a copy counts as hung
+DEFAULT_WORKERS = 2  # top-level folders copied at the same time
+SIZE_SCAN_WORKERS = 8  # top-level folders sized at the same time
+SIZE_SNAPSHOT_PATH = os.path.expanduser("~/.cache/film-file-organizer/source_sizes.json")
+SIZE_SNAPSHOT_MAX_AGE = 6 * 3600  # seconds before the source is scanned again
+DESTINATION = os.path.join(BACKUP_VOLUME, BACKUP_PREFIX + datetime.now().strftime("%Y%m%d_%H%M%S"))
+
+_error_log_lock = threading.Lock()
+# Set on Ctrl-C: workers stop after the file they are copying
+_interrupted = threading.Event()
+
+def _stop_workers(executor):
+    """Drop queued items and make running ones stop at their next file"""
+    _interrupted.set()
+    executor.shutdown(wait=False, cancel_futures=True)
+
+def load_checkpoint(backup_dir):
+    """Checkpoint of a backup folder, or None if it has none"""
+    try:
+        with open(os.path.join(backup_dir, CHECKPOINT_NAME), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def save_checkpoint(backup_dir, checkpoint):
+    """Write the checkpoint atomically so a disconnect never leaves it half-written"""
+    path = os.path.join(backup_dir, CHECKPOINT_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(checkpoint, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
 
-def check_space():
-    """Check if there's enough space on destination"""
+def find_resumable_backup():
+    """Most recent AJ_BACKUP_* folder of this source that did not finish"""
+    for backup_dir in sorted(glob.glob(os.path.join(BACKUP_VOLUME, BACKUP_PREFIX + "*")), reverse=True):
+        checkpoint = load_checkpoint(backup_dir)
+        if checkpoint and checkpoint.get('source') == SOURCE and not checkpoint.get('finished'):
+            return backup_dir, checkpoint
+    return None, None
+
+def list_backups():
+    """All AJ_BACKUP_* folders on the backup volume, oldest first"""
+    return sorted(path for path in glob.glob(os.path.join(BACKUP_VOLUME, BACKUP_PREFIX + "*"))
+                  if os.path.isdir(path))
+
+def find_previous_backup():
+    """
+    Most recent backup of this source that ran to the end, used as the
+    hard-link base. It may have missed a few entries; those are copied.
+    """
+    for backup_dir in reversed(list_backups()):
+        if backup_dir == DESTINATION:
+            continue
+        checkpoint = load_checkpoint(backup_dir)
+        if (checkpoint and checkpoint.get('source') == SOURCE
+                and (checkpoint.get('finished') or checkpoint.get('ended_at'))):
+            return backup_dir
+    return None
+
+def prune_backups(keep):
+    """Delete all but the newest `keep` backups after confirmation"""
+    backups = list_backups()
+    old = backups[:-keep]
+    if not old:
+        print(f"✓ {len(backups)} backup(s) on {BACKUP_VOLUME}, nothing to prune")
+        return
+    
+    print(f"Keeping the newest {keep} of {len(backups)} backup(s). Will delete:")
+    for backup_dir in old:
+        print(f"  {os.path.basename(backup_dir)}")
+    print("(Files hard-linked into newer snapshots stay on disk; only their own data is freed.)")
+    response = input("\nDelete these backups? (yes/no): ").strip().lower()
+    if response != 'yes':
+        print("Prune cancelled.")
+        return
+    
+    for backup_dir in old:
+        try:
+            shutil.rmtree(backup_dir)
+            print(f"  ✓ Deleted {os.path.basename(backup_dir)}")
+        except OSError as e:
+            print(f"  ✗ Could not delete {os.path.basename(backup_dir)}: {e}")
+
+def _tree_size(path, root=None, link_base=None):
+    """
+    (bytes, files) under path, walked with scandir so each entry is stat'ed once.
+    
+    With link_base, files that have an unchanged copy at the same place under
+    link_base (relative to root) are left out: a snapshot hard-links them.
+    """
+    total = files = 0
+    stack = [path]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            if link_base and is_unchanged(entry.path, os.path.join(link_base, os.path.relpath(entry.path, root))):
+                                continue
+                            total += entry.stat(follow_symlinks=False).st_size
+                            files += 1
+                    except OSError:
+                        pass  # unreadable entries are reported by the backup itself
+        except OSError:
+            pass
+    return total, files
+
+def scan_size(root, workers=SIZE_SCAN_WORKERS, link_base=None):
+    """
+    Total (bytes, files) under root, scanning top-level folders in parallel.
+    With link_base, only files a snapshot based on it would have to copy.
+    """
+    try:
+        with os.scandir(root) as it:
+            entries = list(it)
+    except OSError:
+        return 0, 0
+    total = files = 0
+    subdirs = []
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.path)
+            elif entry.is_file(follow_symlinks=False):
+                if link_base and is_unchanged(entry.path, os.path.join(link_base, entry.name)):
+                    continue
+                total += entry.stat(follow_symlinks=False).st_size
+                files += 1
+        except OSError:
+            pass
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for size, count in executor.map(lambda path: _tree_size(path, root, link_base), subdirs):
+            total += size
+            files += count
+    return total, files
+
+def source_size(rescan=False):
+    """Size of SOURCE, reusing a snapshot younger than SIZE_SNAPSHOT_MAX_AGE"""
+    try:
+        with open(SIZE_SNAPSHOT_PATH, 'r', encoding='utf-8') as f:
+            snapshots = json.load(f)
+    except (OSError, ValueError):
+        snapshots = {}
+    
+    snapshot = snapshots.get(SOURCE)
+    if snapshot and not rescan and time.time() - snapshot['scanned_at'] < SIZE_SNAPSHOT_MAX_AGE:
+        age_minutes = (time.time() - snapshot['scanned_at']) / 60
+        print(f"  Using size snapshot from {age_minutes:.0f} min ago (--rescan to refresh)")
+        return snapshot['bytes'], snapshot['files']
+    
+    print(f"  Scanning {SOURCE}...")
+    start = time.monotonic()
+    total, files = scan_size(SOURCE)
+    print(f"  Scanned {files} files in {time.monotonic() - start:.1f}s")
+    
+    snapshots[SOURCE] = {'bytes': total, 'files': files, 'scanned_at': time.time()}
+    try:
+        os.makedirs(os.path.dirname(SIZE_SNAPSHOT_PATH), exist_ok=True)
+        with open(SIZE_SNAPSHOT_PATH, 'w', encoding='utf-8') as f:
+            json.dump(snapshots, f, indent=2)
+    except OSError as e:
+        print(f"  ⚠ Could not save size snapshot: {e}")
+    return total, files
+
+def check_space(resuming=False, limit_mb=0, rescan=False, link_dest=None):
+    """
+    Check that the source fits on the destination and estimate the duration.
+    With link_dest (--snapshot), files unchanged there are hard-linked and
+    cost no space, so only the changed files are counted.
+    
+    Returns the number of bytes still to copy, or None if it will not fit.
+    """
     print("Checking available space...")
     
+    total, files = source_size(rescan)
+    needed = total
+    if link_dest:
+        print(f"  Comparing with {os.path.basename(link_dest)}...")
+        needed, changed_files = scan_size(SOURCE, link_base=link_dest)
+        print(f"  Changed since then: {changed_files} files (the rest is hard-linked)")
+    elif resuming:
+        already_copied, _ = scan_size(DESTINATION)
+        needed = max(total - already_copied, 0)
+        print(f"  Already in {os.path.basename(DESTINATION)}: {format_size(already_copied)}")
+    
     # Get destination stats
-    dest_stat = os.statvfs("/Volumes/AJ8")
-    dest_available = (dest_stat.f_bavail * dest_stat.f_frsize) / (1024**4)  # TB
+    dest_stat = os.statvfs(BACKUP_VOLUME)
+    dest_available = dest_stat.f_bavail * dest_stat.f_frsize
     
-    print(f"  Destination (/Volumes/AJ8) available: {dest_available:.2f} TB")
-    print(f"  Source size needed: ~2.7 TB")
+    print(f"  Source size: {format_size(total)} in {files} files")
+    print(f"  Destination ({BACKUP_VOLUME}) available: {format_size(dest_available)}")
+    print(f"  Still to copy: {format_size(needed)}")
     
-    if dest_available < 3.0:
-        print("  ⚠ Warning: Tight on space, but should work")
+    if needed > dest_available:
+        print(f"  ✗ Not enough space: short by {format_size(needed - dest_available)}")
+        return None
+    if needed > dest_available * 0.95:
+        print("  ⚠ Warning: Tight on space, but should fit")
     else:
         print("  ✓ Sufficient space available")
     
-    return True
+    # Duration estimate from a short write sample on the destination
+    try:
+        throughput = measure_write_throughput(BACKUP_VOLUME)
+    except OSError as e:
+        print(f"  ⚠ Could not measure write speed: {e}")
+        return needed
+    if limit_mb > 0:
+        throughput = min(throughput, limit_mb * 1024 * 1024)
+    if throughput:
+        minutes = needed / throughput / 60
+        print(f"  Write speed sample: {format_size(throughput)}/s")
+        print(f"  Estimated duration: {minutes / 60:.1f} h ({minutes:.0f} min)")
+    
+    return needed
+
+def log_failure(relative, error, attempts):
+    """Append one failing path to the backup's JSONL error log"""
+    record = {'path': relative, 'error': str(error), 'attempts': attempts,
+              'time': datetime.now().strftime("%Y-%m-%d %H:%M:%S")}
+    with _error_log_lock:
+        with open(os.path.join(DESTINATION, ERROR_LOG_NAME), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def load_failures(backup_dir):
+    """Relative paths recorded in a backup's error log"""
+    try:
+        with open(os.path.join(backup_dir, ERROR_LOG_NAME), 'r', encoding='utf-8') as f:
+            return list(dict.fromkeys(json.loads(line)['path'] for line in f if line.strip()))
+    except (OSError, ValueError, KeyError):
+        return []
+
+def _run_with_timeout(func, timeout):
+    """Run func in a helper thread; raise TimeoutError if it does not finish in time"""
+    result = {}
+    def target():
+        try:
+            result['value'] = func()
+        except BaseException as e:
+            result['error'] = e
+    thread = threading.Thread(target=target, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while thread.is_alive() and time.monotonic() < deadline:
+        thread.join(min(1, max(deadline - time.monotonic(), 0)))
+        if _interrupted.is_set() and thread.is_alive():
+            raise KeyboardInterrupt
+    if thread.is_alive():
+        # A hung read on a failing disk cannot be interrupted; leave the thread behind
+        raise TimeoutError(f"no response after {timeout:.0f}s")
+    if 'error' in result:
+        raise result['error']
+    return result.get('value')
+
+class WorkerThrottle(Throttle):
+    """Throttle shared by `workers` copying threads"""
+    
+    def __init__(self, bytes_per_sec, workers):
+        super().__init__(bytes_per_sec)
+        self.workers = max(1, workers)
+    
+    def worker_rate(self):
+        """Rate one worker can count on when all of them are copying"""
+        return self.bytes_per_sec / self.workers
+
+class _AttemptThrottle:
+    """Per-attempt view of the shared throttle; an abandoned copy stops at its next chunk"""
+    
+    def __init__(self, throttle):
+        self.throttle = throttle
+        self.abandoned = threading.Event()
+    
+    def consume(self, num_bytes):
+        if self.throttle is not None:
+            self.throttle.consume(num_bytes)
+        if self.abandoned.is_set():
+            raise TimeoutError("copy abandoned")
+
+def _copy_one(src, dst, previous, resuming, throttle, compare_hash, stats):
+    if resuming and is_unchanged(src, dst):
+        stats['skipped'] += 1
+    elif previous and link_unchanged(src, dst, previous, compare_hash, stats):
+        pass
+    else:
+        copy_file(src, dst, stats=stats, throttle=throttle)
+
+def backup_file(relative, resuming, throttle, link_dest=None, compare_hash=False, stats=None):
+    """
+    Copy SOURCE/relative into DESTINATION with retries and a size-based timeout.
+    
+    Returns True on success; failures are written to the error log.
+    """
+    src = os.path.join(SOURCE, relative)
+    dst = os.path.join(DESTINATION, relative)
+    previous = os.path.join(link_dest, relative) if link_dest else None
+    min_rate = FILE_TIMEOUT_MIN_RATE
+    if throttle is not None:
+        min_rate = min(min_rate, throttle.worker_rate())
+    error = None
+    for attempt in range(1, FILE_ATTEMPTS + 1):
+        attempt_stats = new_stats()
+        attempt_throttle = _AttemptThrottle(throttle)
+        try:
+            size = os.stat(src).st_size
+            timeout = FILE_TIMEOUT + size / min_rate
+            _run_with_timeout(lambda: _copy_one(src, dst, previous, resuming, attempt_throttle,
+                                                compare_hash, attempt_stats), timeout)
+            if stats is not None:
+                add_stats(stats, attempt_stats)
+            return True
+        except TimeoutError as e:
+            attempt_throttle.abandoned.set()
+            error = e
+            break  # a hung file would only hang again
+        except KeyboardInterrupt:
+            attempt_throttle.abandoned.set()
+            raise
+        except OSError as e:
+            error = e
+            if attempt < FILE_ATTEMPTS:
+                time.sleep(RETRY_DELAY * attempt)
+    log_failure(relative, error, attempt)
+    return False
+
+def backup_tree(relative, resuming, throttle, link_dest=None, compare_hash=False, stats=None):
+    """
+    Walk SOURCE/relative and back up each file on its own, so one unreadable
+    entry only loses that entry. Returns the number of failed paths.
+    """
+    failed = 0
+    source_dir = os.path.join(SOURCE, relative)
+    dest_dir = os.path.join(DESTINATION, relative)
+    try:
+        os.makedirs(dest_dir, exist_ok=True)
+        with os.scandir(source_dir) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError as e:
+        log_failure(relative, e, 1)
+        return 1
+    
+    for entry in entries:
+        if _interrupted.is_set():
+            raise KeyboardInterrupt
+        entry_relative = os.path.join(relative, entry.name)
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError as e:
+            log_failure(entry_relative, e, 1)
+            failed += 1
+            continue
+        if is_dir:
+            failed += backup_tree(entry_relative, resuming, throttle, link_dest, compare_hash, stats)
+        elif not backup_file(entry_relative, resuming, throttle, link_dest, compare_hash, stats):
+            failed += 1
+    
+    try:
+        shutil.copystat(source_dir, dest_dir)
+    except OSError:
+        pass
+    return failed
+
+def backup_item(item, resuming, throttle, link_dest=None, compare_hash=False):
+    """Back up one top-level entry. Returns (status, output lines, stats, failed paths)"""
+    source_path = os.path.join(SOURCE, item)
+    lines = []
+    item_stats = new_stats()
+    
+    try:
+        # Check if it's accessible
+        if os.path.isdir(source_path):
+            try:
+                # Test if we can list contents
+                contents = os.listdir(source_path)
+            except Exception as e:
+                lines.append(f"  ✗ Corrupted (cannot access): {e}")
+                log_failure(item, e, 1)
+                return 'corrupted', lines, item_stats, 1
+            
+            # Copy the directory file by file
+            lines.append(f"  → Copying ({len(contents)} items)...")
+            failed = backup_tree(item, resuming, throttle, link_dest, compare_hash, item_stats)
+            if failed:
+                lines.append(f"  ⚠ Partial: {format_rate(item_stats)}")
+                lines.append(f"  ✗ {failed} path(s) failed, see {ERROR_LOG_NAME}")
+                return 'partial', lines, item_stats, failed
+            lines.append(f"  ✓ Success: {format_rate(item_stats)}")
+            return 'ok', lines, item_stats, 0
+                
+        elif os.path.isfile(source_path):
+            # It's a file, copy it
+            if not backup_file(item, resuming, throttle, link_dest, compare_hash, item_stats):
+                lines.append(f"  ✗ Failed, see {ERROR_LOG_NAME}")
+                return 'partial', lines, item_stats, 1
+            lines.append(f"  ✓ Copied file: {format_rate(item_stats)}")
+            return 'ok', lines, item_stats, 0
+        else:
+            lines.append(f"  ✗ Corrupted (neither file nor directory)")
+            log_failure(item, "neither file nor directory", 1)
+            return 'corrupted', lines, item_stats, 1
+            
+    except Exception as e:
+        lines.append(f"  ✗ Error: {e}")
+        log_failure(item, e, 1)
+        return 'error', lines, item_stats, 1
 
-def backup_accessible_folders():
+def retry_failed(backup_dir, workers=DEFAULT_WORKERS, limit_mb=0):
+    """Re-attempt only the paths in a backup's error log"""
+    failures = load_failures(backup_dir)
+    if not failures:
+        print(f"✓ No failed paths recorded in {os.path.basename(backup_dir)}")
+        return 0
+    
+    checkpoint = load_checkpoint(backup_dir) or {}
+    link_dest = checkpoint.get('link_dest')
+    compare_hash = checkpoint.get('compare_hash', False)
+    throttle = WorkerThrottle(limit_mb * 1024 * 1024, workers) if limit_mb > 0 else None
+    # Failures of this run are logged afresh
+    os.replace(os.path.join(backup_dir, ERROR_LOG_NAME),
+               os.path.join(backup_dir, ERROR_LOG_NAME + ".previous"))
+    
+    print(f"\nRetrying {len(failures)} failed path(s) in {backup_dir}")
+    print("="*60)
+    
+    def run(relative):
+        stats = new_stats()
+        if os.path.isdir(os.path.join(SOURCE, relative)):
+            ok = backup_tree(relative, True, throttle, link_dest, compare_hash, stats) == 0
+        else:
+            os.makedirs(os.path.dirname(os.path.join(backup_dir, relative)), exist_ok=True)
+            ok = backup_file(relative, True, throttle, link_dest, compare_hash, stats)
+        return ok, stats
+    
+    still_failing = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        try:
+            for relative, (ok, stats) in zip(failures, executor.map(run, failures)):
+                if ok:
+                    print(f"  ✓ {relative}: {format_rate(stats)}")
+                    if os.sep not in relative and relative not in checkpoint.get('completed', []):
+                        checkpoint.setdefault('completed', []).append(relative)
+                else:
+                    print(f"  ✗ {relative}")
+                    still_failing += 1
+        except KeyboardInterrupt:
+            _stop_workers(executor)
+            raise
+    
+    if checkpoint:
+        # Every entry of a run that reached the end is now backed up
+        if not still_failing and checkpoint.get('ended_at'):
+            checkpoint['finished'] = True
+        save_checkpoint(backup_dir, checkpoint)
+    
+    print("="*60)
+    print(f"Recovered: {len(failures) - still_failing}, still failing: {still_failing}")
+    if still_failing:
+        print(f"Remaining failures: {os.path.join(backup_dir, ERROR_LOG_NAME)}")
+    return still_failing
+
+def backup_accessible_folders(checkpoint=None, workers=DEFAULT_WORKERS, limit_mb=0,
+                              link_dest=None, compare_hash=False):
     """Copy all accessible folders from source to destination"""
     
-    print(f"\nCreating backup directory: {DESTINATION}")
+    resuming = checkpoint is not None
+    if resuming:
+        print(f"\nResuming backup in: {DESTINATION}")
+        link_dest = checkpoint.get('link_dest')
+        compare_hash = checkpoint.get('compare_hash', False)
+    else:
+        print(f"\nCreating backup directory: {DESTINATION}")
+        checkpoint = {'source': SOURCE, 'completed': [], 'finished': False,
+                      'link_dest': link_dest, 'compare_hash': compare_hash}
+    if link_dest:
+        print(f"Hard-linking unchanged files from: {link_dest}")
     os.makedirs(DESTINATION, exist_ok=True)
+    save_checkpoint(DESTINATION, checkpoint)
+    completed = set(checkpoint['completed'])
+    # Paths that fail again are re-logged by this run
+    error_log = os.path.join(DESTINATION, ERROR_LOG_NAME)
+    if os.path.exists(error_log):
+        os.replace(error_log, error_log + ".previous")
+    checkpoint_lock = threading.Lock()
     
     print(f"\nScanning source: {SOURCE}")
     items = sorted(os.listdir(SOURCE))
@@ -43,50 +553,64 @@ def backup_accessible_folders():
     accessible_count = 0
     corrupted_count = 0
     error_count = 0
+    partial_count = 0
+    failed_paths = 0
     
     corrupted_list = []
+    total_stats = new_stats()
+    throttle = WorkerThrottle(limit_mb * 1024 * 1024, workers) if limit_mb > 0 else None
     
-    print(f"Found {total_items} items to process\n")
+    print(f"Found {total_items} items to process")
+    print(f"Workers: {workers}" + (f", limited to {limit_mb} MB/s" if throttle else ""))
     print("="*60)
     
-    for idx, item in enumerate(items, 1):
-        source_path = os.path.join(SOURCE, item)
-        dest_path = os.path.join(DESTINATION, item)
-        
-        # Progress indicator
-        print(f"\n[{idx}/{total_items}] {item}")
-        
+    def run(item):
+        if item in completed:
+            return 'checkpoint', ["  ✓ Already backed up (checkpoint)"], new_stats(), 0
+        result = backup_item(item, resuming, throttle, link_dest, compare_hash)
+        if result[0] == 'ok':
+            with checkpoint_lock:
+                checkpoint['completed'].append(item)
+                save_checkpoint(DESTINATION, checkpoint)
+        return result
+    
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [executor.submit(run, item) for item in items]
         try:
-            # Check if it's accessible
-            if os.path.isdir(source_path):
-                try:
-                    # Test if we can list contents
-                    contents = os.listdir(source_path)
-                    
-                    # Copy the directory
-                    print(f"  → Copying ({len(contents)} items)...")
-                    shutil.copytree(source_path, dest_path, dirs_exist_ok=True)
-                    print(f"  ✓ Success")
+            # Print each entry's output in source order as soon as it is ready
+            for idx, (item, future) in enumerate(zip(items, futures), 1):
+                status, lines, item_stats, failed = future.result()
+                print(f"\n[{idx}/{total_items}] {item}")
+                for line in lines:
+                    print(line)
+                if status in ('ok', 'checkpoint'):
+                    accessible_count += 1
+                elif status == 'partial':
                     accessible_count += 1
-                    
-                except Exception as e:
-                    print(f"  ✗ Corrupted (cannot access): {e}")
+                    partial_count += 1
+                    failed_paths += failed
+                elif status == 'corrupted':
                     corrupted_list.append(item)
                     corrupted_count += 1
-                    
-            elif os.path.isfile(source_path):
-                # It's a file, copy it
-                shutil.copy2(source_path, dest_path)
-                print(f"  ✓ Copied file")
-                accessible_count += 1
-            else:
-                print(f"  ✗ Corrupted (neither file nor directory)")
-                corrupted_list.append(item)
-                corrupted_count += 1
-                
-        except Exception as e:
-            print(f"  ✗ Error: {e}")
-            error_count += 1
+                    failed_paths += failed
+                else:
+                    error_count += 1
+                    failed_paths += failed
+                total_stats['files'] += item_stats['files']
+                total_stats['bytes'] += item_stats['bytes']
+                total_stats['skipped'] += item_stats['skipped']
+                total_stats['linked'] += item_stats['linked']
+        except KeyboardInterrupt:
+            _stop_workers(executor)
+            raise
+    # Items overlap, so the total rate is over wall-clock time
+    total_stats['seconds'] = time.monotonic() - start
+    
+    # Only a backup without failures is finished; anything else stays resumable
+    checkpoint['ended_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    checkpoint['finished'] = not (partial_count or corrupted_count or error_count)
+    save_checkpoint(DESTINATION, checkpoint)
     
     # Summary
     print("\n" + "="*60)
@@ -96,7 +620,13 @@ def backup_accessible_folders():
     print(f"Successfully backed up:   {accessible_count}")
     print(f"Corrupted (skipped):      {corrupted_count}")
     print(f"Errors:                   {error_count}")
+    print(f"Partially backed up:      {partial_count} ({failed_paths} failed path(s))")
+    print(f"Data copied:              {format_rate(total_stats)}")
     print(f"\nBackup location: {DESTINATION}")
+    if failed_paths:
+        print(f"Failed paths logged to: {error_log}")
+        print("Re-attempt just those with: python emergency_backup_to_aj8.py --retry-failed")
+        print("  or continue this backup with: python emergency_backup_to_aj8.py --resume")
     
     # Save corrupted list
     if corrupted_list:
@@ -111,6 +641,45 @@ def backup_accessible_folders():
     return accessible_count, corrupted_count
 
 def main():
+    global DESTINATION
+    parser = argparse.ArgumentParser(description="Emergency backup of /Volumes/Films/AJ to /Volumes/AJ8")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the most recent unfinished backup instead of starting a new one")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"top-level folders to copy concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--limit", type=float, default=0,
+                        help="combined copy speed limit in MB/s (default: unlimited)")
+    parser.add_argument("--rescan", action="store_true",
+                        help="size the source again instead of using a recent snapshot")
+    parser.add_argument("--snapshot", action="store_true",
+                        help="hard-link files unchanged since the previous backup instead of copying them")
+    parser.add_argument("--verify-hash", action="store_true",
+                        help="with --snapshot, also compare partial hashes before linking")
+    parser.add_argument("--prune", type=int, metavar="N",
+                        help="delete all but the newest N backups and exit")
+    parser.add_argument("--retry-failed", action="store_true",
+                        help="re-attempt only the paths logged as failed in the newest backup and exit")
+    args = parser.parse_args()
+    if args.prune is not None and args.prune < 1:
+        parser.error("--prune N must keep at least one backup (N >= 1)")
+    
+    if args.retry_failed:
+        backups = [path for path in list_backups() if load_failures(path)]
+        if not backups:
+            print("✓ No backup with failed paths found")
+            return
+        DESTINATION = backups[-1]
+        if retry_failed(DESTINATION, workers=args.workers, limit_mb=args.limit):
+            sys.exit(1)
+        return
+    
+    if args.prune is not None:
+        if not os.path.exists(BACKUP_VOLUME):
+            print(f"✗ Destination volume not mounted: {BACKUP_VOLUME}")
+            sys.exit(1)
+        prune_backups(args.prune)
+        return
+    
     print("="*60)
     print("EMERGENCY BACKUP: /Volumes/Films/AJ → /Volumes/AJ8")
     print("="*60)
@@ -121,17 +690,37 @@ def main():
         sys.exit(1)
     
     # Check destination exists
-    if not os.path.exists("/Volumes/AJ8"):
-        print(f"✗ Destination volume not mounted: /Volumes/AJ8")
+    if not os.path.exists(BACKUP_VOLUME):
+        print(f"✗ Destination volume not mounted: {BACKUP_VOLUME}")
         sys.exit(1)
     
+    checkpoint = None
+    if args.resume:
+        backup_dir, checkpoint = find_resumable_backup()
+        if backup_dir:
+            DESTINATION = backup_dir
+            print(f"→ Resuming {os.path.basename(backup_dir)} "
+                  f"({len(checkpoint['completed'])} top-level item(s) already done)")
+        else:
+            print("→ No unfinished backup found, starting a new one")
+    
+    link_dest = None
+    if args.snapshot and checkpoint is None:
+        link_dest = find_previous_backup()
+        if link_dest:
+            print(f"→ Snapshot based on {os.path.basename(link_dest)}")
+        else:
+            print("→ No previous finished backup found, making a full copy")
+    
     # Check space
-    if not check_space():
+    needed = check_space(resuming=checkpoint is not None, limit_mb=args.limit, rescan=args.rescan,
+                         link_dest=link_dest)
+    if needed is None:
         sys.exit(1)
     
     # Confirm
     print("\n" + "="*60)
-    print("⚠  This will copy ~2.7TB of data")
+    print(f"⚠  This will copy up to {format_size(needed)} of data")
     print("⚠  This may take several hours")
     print("⚠  Only accessible folders will be copied")
     print("="*60)
@@ -145,7 +734,8 @@ def main():
     print("\nStarting backup...")
     print("(This will take a while - do not interrupt)\n")
     
-    accessible, corrupted = backup_accessible_folders()
+    accessible, corrupted = backup_accessible_folders(checkpoint, workers=args.workers, limit_mb=args.limit,
+                                                      link_dest=link_dest, compare_hash=args.verify_hash)
     
     print("\n" + "="*60)
     if corrupted == 0:
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+File hashing helpers for duplicate detection and copy verification.
+
+- partial_hash: size + first and last chunk, a cheap filter before reading
+  whole files
+- full_hash: streams the whole file with large read buffers
+- hash_files: hashes many files with a bounded thread pool
+- hash_files_per_device: one bounded pool per device, so two disks are
+  read in parallel without thrashing either of them
+
+xxHash (xxh3_128) is used when the xxhash package is installed, otherwise
+BLAKE2b from hashlib.
+"""
+
+import hashlib
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional
+
+try:
+    import xxhash
+except ImportError:  # optional dependency
+    xxhash = None
+
+HASH_BUFFER_SIZE = 8 * 1024 * 1024   # 8 MiB reads for full hashes
+PARTIAL_CHUNK_SIZE = 1024 * 1024     # 1 MiB from the head and the tail
+DEFAULT_HASH_WORKERS = 4
+
+HASH_NAME = 'xxh3_128' if xxhash is not None else 'blake2b'
+
+
+def new_hasher():
+    if xxhash is not None:
+        return xxhash.xxh3_128()
+    return hashlib.blake2b(digest_size=16)
+
+
+def partial_hash(path: str, chunk_size: int = PARTIAL_CHUNK_SIZE) -> str:
+    """Hash of the file size plus its first and last chunk."""
+    hasher = new_hasher()
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        hasher.update(str(size).encode())
+        hasher.update(f.read(chunk_size))
+        if size > chunk_size:
+            f.seek(max(size - chunk_size, chunk_size))
+            hasher.update(f.read(chunk_size))
+    return hasher.hexdigest()
+
+
+def full_hash(path: str, buffer_size: int = HASH_BUFFER_SIZE) -> str:
+    """Hash of the whole file content."""
+    hasher = new_hasher()
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buf)
+            if not n:
+                break
+            hasher.update(view[:n])
+    return hasher.hexdigest()
+
+
+def _safe_hash(hash_func: Callable[[str], str], path: str) -> Optional[str]:
+    try:
+        return hash_func(path)
+    except OSError:
+        return None
+
+
+def hash_files(paths: Iterable[str], hash_func: Callable[[str], str] = full_hash,
+               workers: int = DEFAULT_HASH_WORKERS) -> Dict[str, Optional[str]]:
+    """Hash paths concurrently. Unreadable files map to None."""
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        return dict(zip(paths, executor.map(lambda path: _safe_hash(hash_func, path), paths)))
+
+
+def hash_files_per_device(paths: Iterable[str], hash_func: Callable[[str], str] = full_hash,
+                          workers_per_device: int = DEFAULT_HASH_WORKERS) -> Dict[str, Optional[str]]:
+    """Like hash_files, but with a separate bounded thread pool for each device."""
+    by_device = defaultdict(list)
+    results = {}
+    for path in paths:
+        try:
+            by_device[os.stat(path).st_dev].append(path)
+        except OSError:
+            results[path] = None
+
+    executors = [ThreadPoolExecutor(max_workers=max(1, workers_per_device)) for _ in by_device]
+    try:
+        futures = {}
+        for executor, device_paths in zip(executors, by_device.values()):
+            for path in device_paths:
+                futures[path] = executor.submit(_safe_hash, hash_func, path)
+        for path, future in futures.items():
+            results[path] = future.result()
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True)
+    return results
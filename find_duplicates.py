@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Find duplicate films across one or more library roots.
+
+Stages, cheapest first, so a multi-TB library is never read end to end:
+1. Group video files by film folder name ("YYYY - Title", case and Unicode
+   normalization ignored) and, separately, by exact file size.
+2. Same-size candidates are compared by a partial hash (size + head + tail).
+3. Only files whose partial hashes match are fully hashed, in parallel.
+
+Roots are resolved with realpath and roots nested in another root are
+dropped, and every file is identified by (device, inode), so overlapping
+roots and hard links are never reported as duplicates of themselves.
+
+Reports:
+- Same film stored in more than one folder, with resolution and size, so the
+  lower-quality copy can be removed. These are matched by folder name only
+  and are unconfirmed unless a copy is marked identical by the full hash.
+- Byte-identical files (confirmed by full hash).
+
+Usage:
+    python find_duplicates.py /Volumes/Films/AJ "/Volumes/Films/Not Watched Yet"
+    python find_duplicates.py /Volumes/Films/AJ --workers 8 --min-size 100
+"""
+
+import argparse
+import os
+import re
+import sys
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from copy_engine import format_size
+from file_hash import hash_files, partial_hash, full_hash, HASH_NAME
+from media_probe import probe_files
+from sidecar_index import VIDEO_EXTENSIONS
+
+FILM_FOLDER_PATTERN = re.compile(r'^\s*(\d{4})\s*-\s*(.+?)\s*$')
+
+
+def film_key(folder_name: str):
+    """'1993 - Schindler's List' -> ('1993', "schindler's list"), or None."""
+    match = FILM_FOLDER_PATTERN.match(unicodedata.normalize('NFC', folder_name))
+    if not match:
+        return None
+    return match.group(1), match.group(2).casefold()
+
+
+def canonical_roots(roots: List[str]) -> List[str]:
+    """Real paths of the roots, without duplicates or roots inside another root."""
+    resolved = sorted(set(os.path.realpath(root) for root in roots))
+    kept = []
+    for root in resolved:
+        if not any(os.path.commonpath([root, outer]) == outer for outer in kept):
+            kept.append(root)
+    return kept
+
+
+def scan_videos(roots: List[str], min_size: int) -> List[Tuple[str, int]]:
+    """
+    Walk the roots with scandir and return (path, size) for every video file.
+
+    Each (st_dev, st_ino) is listed once, so a hard link or a file reached
+    through two roots is not mistaken for a second copy.
+    """
+    videos = []
+    seen = set()
+    stack = canonical_roots(roots)
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS:
+                            st = entry.stat(follow_symlinks=False)
+                            if st.st_size < min_size or (st.st_dev, st.st_ino) in seen:
+                                continue
+                            seen.add((st.st_dev, st.st_ino))
+                            videos.append((entry.path, st.st_size))
+                    except OSError as e:
+                        print(f"  ✗ Cannot read {entry.path}: {e}", file=sys.stderr)
+        except OSError as e:
+            print(f"  ✗ Cannot list {directory}: {e}", file=sys.stderr)
+    return videos
+
+
+def group_by_film(videos: List[Tuple[str, int]]) -> Dict[tuple, Dict[str, List[Tuple[str, int]]]]:
+    """Film key -> {film folder: [(path, size)]}, only films found in 2+ folders."""
+    films = defaultdict(lambda: defaultdict(list))
+    for path, size in videos:
+        folder = os.path.dirname(path)
+        key = film_key(os.path.basename(folder))
+        if key:
+            films[key][folder].append((path, size))
+    return {key: folders for key, folders in films.items() if len(folders) > 1}
+
+
+def find_identical(videos: List[Tuple[str, int]], workers: int) -> List[List[str]]:
+    """Groups of byte-identical files: size -> partial hash -> full hash."""
+    by_size = defaultdict(list)
+    for path, size in videos:
+        by_size[size].append(path)
+    candidates = [paths for paths in by_size.values() if len(paths) > 1]
+    print(f"  {sum(len(p) for p in candidates)} file(s) share a size with another file")
+
+    partial = hash_files([p for paths in candidates for p in paths], partial_hash, workers)
+    by_partial = defaultdict(list)
+    for paths in candidates:
+        for path in paths:
+            if partial[path] is not None:
+                by_partial[partial[path]].append(path)
+    candidates = [paths for paths in by_partial.values() if len(paths) > 1]
+    print(f"  {sum(len(p) for p in candidates)} file(s) match on partial hash, full-hashing them")
+
+    full = hash_files([p for paths in candidates for p in paths], full_hash, workers)
+    by_full = defaultdict(list)
+    for paths in candidates:
+        for path in paths:
+            if full[path] is not None:
+                by_full[full[path]].append(path)
+    return [sorted(paths) for paths in by_full.values() if len(paths) > 1]
+
+
+def quality(info, size):
+    return ((info or {}).get('resolution', 0), size)
+
+
+def report_films(films, identical=()):
+    """
+    Film-name groups are unconfirmed: the folders only share a name. A copy
+    is marked identical when the full hash put it in the kept copy's group.
+    """
+    if not films:
+        print("✓ No film is stored in more than one folder.")
+        return
+    group_of = {path: index for index, paths in enumerate(identical) for path in paths}
+    print(f"\n🎬 {len(films)} film(s) stored in more than one folder "
+          f"(matched by folder name only, unconfirmed unless marked identical):\n")
+    paths = [path for folders in films.values() for files in folders.values() for path, _ in files]
+    infos = probe_files(paths)
+    for key in sorted(films):
+        folders = films[key]
+        copies = []
+        for folder, files in folders.items():
+            path, size = max(files, key=lambda item: quality(infos.get(item[0]), item[1]))
+            copies.append((quality(infos.get(path), size), folder, path, size))
+        copies.sort(reverse=True)
+        print(os.path.basename(copies[0][1]))
+        kept_group = group_of.get(copies[0][2])
+        for index, ((resolution, _), folder, path, size) in enumerate(copies):
+            if index == 0:
+                marker = "keep"
+            elif kept_group is not None and group_of.get(path) == kept_group:
+                marker = f"identical ({HASH_NAME} match)"
+            else:
+                marker = "lower quality, unconfirmed"
+            print(f"   {resolution or '?'}p  {format_size(size):>10}  {path}  ← {marker}")
+        print()
+
+
+def report_identical(groups):
+    if not groups:
+        print("✓ No byte-identical video files found.")
+        return
+    wasted = 0
+    print(f"\n📄 {len(groups)} group(s) of byte-identical files ({HASH_NAME}):\n")
+    for paths in groups:
+        size = os.path.getsize(paths[0])
+        wasted += size * (len(paths) - 1)
+        print(f"{format_size(size)}:")
+        for path in paths:
+            print(f"   {path}")
+        print()
+    print(f"Space used by extra copies: {format_size(wasted)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find duplicate films across library roots.")
+    parser.add_argument("roots", nargs="+", help="library root folders to scan")
+    parser.add_argument("--workers", type=int, default=4, help="parallel hashing threads (default: 4)")
+    parser.add_argument("--min-size", type=int, default=50,
+                        help="ignore videos smaller than this many MB (default: 50)")
+    args = parser.parse_args()
+
+    for root in args.roots:
+        if not os.path.isdir(root):
+            print(f"✗ Error: Folder not found: {root}")
+            sys.exit(1)
+
+    roots = canonical_roots(args.roots)
+    if len(roots) < len(args.roots):
+        print(f"→ {len(args.roots) - len(roots)} root(s) skipped: same as or inside another root")
+    print(f"📁 Scanning {len(roots)} root(s)...")
+    videos = scan_videos(roots, args.min_size * 1024 * 1024)
+    print(f"  Found {len(videos)} video file(s)")
+
+    print("Looking for byte-identical files...")
+    identical = find_identical(videos, args.workers)
+
+    report_films(group_by_film(videos), identical)
+    report_identical(identical)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,75 +1,64 @@
 #!/usr/bin/env python3
 """
 Direct Unicode normalization fixer for NAS folders.
-Renames all items with NFC encoding to NFD for macOS compatibility.
+Renames all items with NFC encoding to NFD for macOS compatibility,
+at every depth of the folder (or back to NFC with --nfc).
+--workers N processes N director folders at a time, which helps over SMB.
 """
 
 import os
-import unicodedata
 import sys
+import time
 
-def fix_folder(folder_path, dry_run=False):
+from unicode_normalize import plan_renames, apply_renames, rename_entry, print_progress
+
+def fix_folder(folder_path, dry_run=False, form='NFD', workers=1):
     """
-    Rename all items in a folder from NFC to NFD normalization.
+    Rename all items in a folder tree, at any depth, to the given
+    normalization form (NFD by default).
     """
-    items = os.listdir(folder_path)
-    fixed_count = 0
-    error_count = 0
+    plan = plan_renames(folder_path, form=form, workers=workers)
     
-    # Sort by depth - rename directories first before items inside them
-    items_sorted = []
-    for item in items:
-        full_path = os.path.join(folder_path, item)
-        is_dir = os.path.isdir(full_path)
-        items_sorted.append((item, is_dir))
+    def rename(op, dry_run):
+        rename_entry(op, dry_run)
+        item = os.path.relpath(op['src'], folder_path)
+        if dry_run:
+            print(f"[DRY RUN] Would rename: {item[:80]}...")
+        else:
+            print(f"✓ Renamed: {item[:80]}...")
     
-    # Process directories first (reverse order to handle nested items)
-    for item, is_dir in sorted(items_sorted, key=lambda x: not x[1]):
-        if item.startswith('.'):
-            continue
-        
-        full_path = os.path.join(folder_path, item)
-        
-        # Check if needs fixing
-        nfc_form = unicodedata.normalize('NFC', item)
-        nfd_form = unicodedata.normalize('NFD', item)
-        
-        if nfc_form != nfd_form:
-            new_path = os.path.join(folder_path, nfd_form)
-            
-            try:
-                if not dry_run:
-                    os.rename(full_path, new_path)
-                    print(f"✓ Renamed: {item[:50]}...")
-                else:
-                    print(f"[DRY RUN] Would rename: {item[:50]}...")
-                fixed_count += 1
-            except Exception as e:
-                print(f"✗ Error renaming {item}: {str(e)}")
-                error_count += 1
+    # Deepest entries first, so parent folders are renamed after their contents
+    fixed_count, failures = apply_renames(plan, rename, dry_run=dry_run, workers=workers,
+                                          progress=print_progress if workers > 1 else None)
+    for op, e in failures:
+        print(f"✗ Error renaming {os.path.relpath(op['src'], folder_path)}: {str(e)}")
     
-    return fixed_count, error_count
+    return fixed_count, len(failures)
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print("Usage: python fix_unicode_direct.py <folder> [--fix]")
+        print("Usage: python fix_unicode_direct.py <folder> [--fix] [--nfc] [--workers N]")
         sys.exit(1)
     
     folder = sys.argv[1]
     fix_mode = '--fix' in sys.argv
+    form = 'NFC' if '--nfc' in sys.argv else 'NFD'
+    workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else 1
     
     if not os.path.isdir(folder):
         print(f"Error: Folder not found: {folder}")
         sys.exit(1)
     
-    print(f"Processing: {folder}\n")
+    print(f"Processing: {folder} (to {form})\n")
     
     if fix_mode:
         print("FIXING MODE - Renaming files...\n")
-        fixed, errors = fix_folder(folder, dry_run=False)
-        print(f"\nCompleted: {fixed} renamed, {errors} errors")
+        start = time.monotonic()
+        fixed, errors = fix_folder(folder, dry_run=False, form=form, workers=workers)
+        print(f"\nCompleted: {fixed} renamed, {errors} errors in {time.monotonic() - start:.1f}s "
+              f"({workers} worker(s))")
     else:
         print("PREVIEW MODE - No changes made\n")
-        fixed, errors = fix_folder(folder, dry_run=True)
+        fixed, errors = fix_folder(folder, dry_run=True, form=form, workers=workers)
         print(f"\nWould fix: {fixed} items")
         print("\nTo apply fixes, run: python fix_unicode_direct.py '<folder>' --fix")
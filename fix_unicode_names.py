@@ -4,18 +4,23 @@ Fix Unicode Filename Compatibility Issues for NAS-to-macOS Transfer
 
 This script normalizes filenames from Synology NAS to be compatible with macOS.
 It converts filenames from NFC (Composed) to NFD (Decomposed) Unicode form,
-which is required by macOS's HFS+ filesystem.
+which is required by macOS's HFS+ filesystem, at every depth of the folder.
+--nfc converts back to NFC instead. --workers N scans and renames N director
+folders at a time, which helps over SMB.
 
 Usage:
-    python fix_unicode_names.py /path/to/folder
+    python fix_unicode_names.py /path/to/folder [--fix] [--nfc] [--workers N]
 """
 
 import os
 import unicodedata
 import sys
+import time
 import subprocess
 from pathlib import Path
 
+from unicode_normalize import plan_renames, apply_renames, rename_entry, needs_normalization, print_progress
+
 
 def normalize_filename(filename):
     """
@@ -27,79 +32,31 @@ def normalize_filename(filename):
     Returns:
         Tuple of (original_filename, normalized_filename, needs_change)
     """
-    # Decompose to NFD form (what macOS expects)
-    nfc_form = unicodedata.normalize('NFC', filename)
-    nfd_form = unicodedata.normalize('NFD', filename)
-    
-    # Check if the filename actually changed
-    needs_change = nfc_form != nfd_form
+    # Only build the NFD form (what macOS expects) when the name is not already NFD
+    needs_change = needs_normalization(filename, 'NFD')
+    nfd_form = unicodedata.normalize('NFD', filename) if needs_change else filename
     
     return filename, nfd_form, needs_change
 
 
-def get_problematic_files(folder_path):
+def get_problematic_files(folder_path, form='NFD', workers=1):
     """
-    Scan folder and find directories that need Unicode normalization.
-    Focuses on top-level directories where the NAS encoding issue is most critical.
+    Scan a folder tree, at any depth, for names that need Unicode normalization.
     
     Args:
         folder_path: Path to scan
+        form: Target normalization form ('NFD' for macOS, 'NFC' to undo)
+        workers: Number of director folders scanned at a time
         
     Returns:
         List of dicts with directory/file info
     """
-    problematic_items = []
-    
     print("Scanning for Unicode normalization issues...", file=sys.stderr)
     
-    # Scan current directory level only (director folders)
-    try:
-        items = os.listdir(folder_path)
-    except Exception as e:
-        print(f"Error scanning: {e}")
-        return []
-    
-    for item_name in items:
-        item_path = os.path.join(folder_path, item_name)
-        
-        # Check the item name for NFC/NFD mismatch
-        nfc_form = unicodedata.normalize('NFC', item_name)
-        nfd_form = unicodedata.normalize('NFD', item_name)
-        
-        if nfc_form != nfd_form:  # Has a mismatch
-            item_type = 'directory' if os.path.isdir(item_path) else 'file'
-            problematic_items.append({
-                'original': item_name,
-                'normalized': nfd_form,
-                'full_path': item_path,
-                'directory': folder_path,
-                'type': item_type
-            })
-        
-        # For directories, also recursively check subdirectories (one level deep)
-        if os.path.isdir(item_path) and not item_name.startswith('.'):
-            try:
-                subitems = os.listdir(item_path)
-                for subitem_name in subitems:
-                    subitem_path = os.path.join(item_path, subitem_name)
-                    
-                    # Check the subitem name for NFC/NFD mismatch
-                    nfc_form = unicodedata.normalize('NFC', subitem_name)
-                    nfd_form = unicodedata.normalize('NFD', subitem_name)
-                    
-                    if nfc_form != nfd_form:  # Has a mismatch
-                        subitem_type = 'directory' if os.path.isdir(subitem_path) else 'file'
-                        problematic_items.append({
-                            'original': subitem_name,
-                            'normalized': nfd_form,
-                            'full_path': subitem_path,
-                            'directory': item_path,
-                            'type': subitem_type
-                        })
-            except (PermissionError, OSError):
-                # Skip directories we can't read
-                pass
-    
+    problematic_items = plan_renames(folder_path, form=form, workers=workers)
+    for item in problematic_items:
+        item['full_path'] = item['src']
+        item['type'] = 'directory' if item['is_dir'] else 'file'
     return problematic_items
 
 
@@ -136,45 +93,40 @@ def preview_changes(problematic_files):
     return True
 
 
-def fix_files(problematic_files, dry_run=True):
+def fix_files(problematic_files, dry_run=True, workers=1):
     """
     Rename files and directories to use correct Unicode normalization.
     
     Args:
         problematic_files: List of files/dirs to fix
         dry_run: If True, only show what would be done (default: True)
+        workers: Number of director folders renamed at a time
     """
     if not problematic_files:
         print("✓ No files to fix.")
         return
     
-    # Sort by path depth (deepest first) to rename directories before files inside them
-    sorted_items = sorted(problematic_files, key=lambda x: x['full_path'].count(os.sep), reverse=True)
-    
-    failed = []
-    succeeded = 0
-    
-    for item_info in sorted_items:
+    def rename(item_info, dry_run):
         old_path = item_info['full_path']
-        new_path = os.path.join(item_info['directory'], item_info['normalized'])
         item_type = item_info['type']
-        
-        try:
-            if dry_run:
-                print(f"[DRY RUN] Would rename {item_type}: {item_info['original']} → {item_info['normalized']}")
-            else:
-                if os.path.exists(old_path):
-                    os.rename(old_path, new_path)
-                    print(f"✓ Renamed {item_type}: {item_info['original']}")
-                    succeeded += 1
-                else:
-                    failed.append(f"{item_type.capitalize()} not found: {old_path}")
-        except Exception as e:
-            failed.append(f"Error renaming {item_info['original']}: {str(e)}")
+        if dry_run:
+            print(f"[DRY RUN] Would rename {item_type}: {item_info['original']} → {item_info['normalized']}")
+            return
+        if not os.path.exists(old_path):
+            raise FileNotFoundError(f"{item_type.capitalize()} not found: {old_path}")
+        rename_entry(item_info)
+        print(f"✓ Renamed {item_type}: {item_info['original']}")
+    
+    # Deepest entries first, so directories are renamed after the items inside them
+    start = time.monotonic()
+    succeeded, failures = apply_renames(problematic_files, rename, dry_run=dry_run, workers=workers,
+                                        progress=print_progress if workers > 1 else None)
+    elapsed = time.monotonic() - start
+    failed = [f"Error renaming {item_info['original']}: {str(e)}" for item_info, e in failures]
     
     print()
     if not dry_run:
-        print(f"✓ Successfully renamed: {succeeded} item(s)")
+        print(f"✓ Successfully renamed: {succeeded} item(s) in {elapsed:.1f}s ({workers} worker(s))")
         if failed:
             print(f"✗ Failed: {len(failed)} item(s)")
             for error in failed:
@@ -183,7 +135,7 @@ def fix_files(problematic_files, dry_run=True):
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python fix_unicode_names.py <folder_path> [--fix]")
+        print("Usage: python fix_unicode_names.py <folder_path> [--fix] [--nfc] [--workers N]")
         print()
         print("Examples:")
         print("  python fix_unicode_names.py /path/to/films")
@@ -195,6 +147,8 @@ def main():
     
     folder_path = sys.argv[1]
     fix_mode = '--fix' in sys.argv
+    form = 'NFC' if '--nfc' in sys.argv else 'NFD'
+    workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else 1
     
     # Validate folder exists
     if not os.path.isdir(folder_path):
@@ -205,7 +159,7 @@ def main():
     print()
     
     # Find problematic files
-    problematic_files = get_problematic_files(folder_path)
+    problematic_files = get_problematic_files(folder_path, form=form, workers=workers)
     
     # Show preview
     has_issues = preview_changes(problematic_files)
@@ -218,7 +172,7 @@ def main():
         response = input("\n⚠️  Proceed with renaming? (yes/no): ").strip().lower()
         if response == 'yes':
             print("\n🔧 Fixing files...\n")
-            fix_files(problematic_files, dry_run=False)
+            fix_files(problematic_files, dry_run=False, workers=workers)
             print("\n✓ Done!")
         else:
             print("Cancelled.")
@@ -9,6 +9,10 @@ import requests
 from bs4 import BeautifulSoup
 import json
 import time
+from copy_engine import move_file, move_tree, merge_tree, new_stats, format_rate
+from move_queue import MoveQueue
+from sidecar_index import VIDEO_EXTENSIONS, SUBTITLE_EXTENSIONS, get_index, sidecar_suffix
+from name_resolver import resolve_name, resolve_path, same_path
 
 # Enable tab completion for folder paths
 def complete_path(text, state):
@@ -18,16 +22,15 @@ readline.set_completer_delims('')
 readline.parse_and_bind("tab: complete")
 readline.set_completer(complete_path)
 
-# File extension categories
-VIDEO_EXTENSIONS = {'.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.mpg', '.mpeg', '.m2ts', '.ts', '.vob', '.ogv', '.3gp'}
-SUBTITLE_EXTENSIONS = {'.srt', '.sub', '.ass', '.ssa', '.vtt', '.idx'}
+# File extension categories (video/subtitle sets are shared via sidecar_index)
 DVD_EXTENSIONS = {'.ifo', '.bup', '.vob'}
 AUTO_DELETE_EXTENSIONS = {'.nfo', '.jpg', '.jpeg', '.png', '.gif', '.bmp', '.txt', '.xml', '.db', '.url'}
 AUDIO_EXTENSIONS = {'.mp3', '.flac', '.wav', '.aac', '.ogg', '.m4a', '.wma'}
 
 # Function to clean up extra files in a directory
-def cleanup_directory(directory_path, auto_delete=True):
-    """Remove unnecessary files from a movie directory, keeping only video and subtitle files"""
+def cleanup_directory(directory_path, auto_delete=True, ask_unknown=True):
+    """Remove unnecessary files from a movie directory, keeping only video and subtitle files.
+    With ask_unknown=False (background moves) unknown file types are kept without prompting."""
     deleted_files = []
     kept_files = []
     
@@ -56,6 +59,9 @@ def cleanup_directory(directory_path, auto_delete=True):
                 continue
             
             # Ask about unknown files
+            if not ask_unknown:
+                kept_files.append(file_path)
+                continue
             print(f"  → Unknown file type: {filename} ({ext})")
             choice = input(f"    Delete this file? (y/n/all): ").strip().lower()
             if choice == 'y':
@@ -276,7 +282,10 @@ def get_movie_data_by_id(imdb_id):
 # Function to check if a file/folder is already organized
 def is_already_organized(current_path, expected_director, expected_year, expected_title, target_folder_path):
     """Check if a file or folder is already in the correct director/year/title structure"""
-    expected_structure = os.path.join(target_folder_path, expected_director, f"{expected_year} - {expected_title}")
+    # IMDb names are NFC; match them against the folders as spelled on disk
+    folder_name = f"{expected_year} - {expected_title}"
+    expected_structure = (resolve_path(target_folder_path, expected_director, folder_name)
+                          or os.path.join(target_folder_path, expected_director, folder_name))
     
     # Get the parent directory of the current path
     if os.path.isfile(current_path):
@@ -284,35 +293,40 @@ def is_already_organized(current_path, expected_director, expected_year, expecte
     else:
         parent_path = current_path
     
-    # Normalize paths for comparison
-    parent_normalized = os.path.normpath(parent_path)
-    expected_normalized = os.path.normpath(expected_structure)
-    
-    return parent_normalized == expected_normalized
+    return same_path(parent_path, expected_structure)
 
-# Function to organize DVD folder structure
-def organize_dvd_folder(dvd_folder_path, movie_data, target_folder_path):
-    """Move entire DVD folder structure to organized location"""
+# Function to get the organized destination folder for a movie
+def get_destination_folder(movie_data, target_folder_path):
+    """Return target/Director(s)/Year - Title for the given movie data.
+    Folders that already exist keep their on-disk spelling (NFC or NFD), so
+    no normalization twin of an existing director or film folder is created."""
     directors = movie_data.get('director', [])
     director_names = ', '.join(director['name'] for director in directors) if directors else "Unknown"
     release_year = movie_data.get('year', 'Unknown')
     movie_name = movie_data.get('title', 'Unknown')
+    folder_name = f"{release_year} - {movie_name}"
+    director_path = os.path.join(target_folder_path,
+                                 resolve_name(target_folder_path, director_names) or director_names)
+    return os.path.join(director_path, resolve_name(director_path, folder_name) or folder_name)
 
-    dir_structure = os.path.join(target_folder_path, director_names, f"{release_year} - {movie_name}")
+# Function to organize DVD folder structure
+def organize_dvd_folder(dvd_folder_path, movie_data, target_folder_path, ask_unknown=True):
+    """Move entire DVD folder structure to organized location"""
+    dir_structure = get_destination_folder(movie_data, target_folder_path)
 
     if not os.path.exists(dir_structure):
         os.makedirs(dir_structure)
 
     # Check if the DVD folder is already at the correct location
-    if os.path.normpath(dvd_folder_path) == os.path.normpath(dir_structure):
+    if same_path(dvd_folder_path, dir_structure):
         print(f"  → DVD folder is already organized at: {dir_structure}")
         # Still run cleanup even if already organized
-        cleanup_directory(dvd_folder_path, auto_delete=True)
+        cleanup_directory(dvd_folder_path, auto_delete=True, ask_unknown=ask_unknown)
         return
     
     # Move the contents of the DVD folder (VIDEO_TS, AUDIO_TS, etc.) to the target
     # rather than moving the whole folder
-    import shutil
+    stats = new_stats()
     for item in os.listdir(dvd_folder_path):
         source_item = os.path.join(dvd_folder_path, item)
         dest_item = os.path.join(dir_structure, item)
@@ -320,17 +334,18 @@ def organize_dvd_folder(dvd_folder_path, movie_data, target_folder_path):
         if os.path.exists(dest_item):
             # If destination already exists, skip or merge
             if os.path.isdir(dest_item):
-                # Merge directories if needed
-                shutil.copytree(source_item, dest_item, dirs_exist_ok=True)
-                shutil.rmtree(source_item)
+                # Merge directories if needed (renames on the same volume)
+                merge_tree(source_item, dest_item, conflict='replace', stats=stats)
             else:
                 print(f"  → Warning: {item} already exists at destination, skipping")
         else:
-            shutil.move(source_item, dest_item)
+            move_tree(source_item, dest_item, stats=stats)
+    if stats['files']:
+        print(f"  → Copied {format_rate(stats)}")
     
     # Clean up unnecessary files in the DVD folder
     print(f"  → Cleaning up extra files in DVD folder...")
-    cleanup_directory(dir_structure, auto_delete=True)
+    cleanup_directory(dir_structure, auto_delete=True, ask_unknown=ask_unknown)
     
     # Delete the now empty source DVD folder
     try:
@@ -339,7 +354,7 @@ def organize_dvd_folder(dvd_folder_path, movie_data, target_folder_path):
     except OSError:
         pass
     
-    # Delete the now empty parent folders
+    # Delete the now empty parent folders (OSError: a concurrent move removed one first)
     parent_dir = os.path.dirname(dvd_folder_path)
     while parent_dir != target_folder_path and parent_dir and os.path.exists(parent_dir):
         try:
@@ -352,33 +367,55 @@ def organize_dvd_folder(dvd_folder_path, movie_data, target_folder_path):
             break
 
 # Function to create directory structure and move files
-def organize_movie(file, movie_data, folder_path):
-    directors = movie_data.get('director', [])
-    director_names = ', '.join(director['name'] for director in directors) if directors else "Unknown"
-    release_year = movie_data.get('year', 'Unknown')
+def organize_movie(file, movie_data, folder_path, ask_unknown=True):
     movie_name = movie_data.get('title', 'Unknown')
-
-    dir_structure = os.path.join(folder_path, director_names, f"{release_year} - {movie_name}")
+    dir_structure = get_destination_folder(movie_data, folder_path)
 
     if not os.path.exists(dir_structure):
         os.makedirs(dir_structure)
 
     source_file_path = file
     dest_file_path = os.path.join(dir_structure, os.path.basename(file))
+    source_index = get_index(os.path.dirname(file))
+    dest_index = get_index(dir_structure)
+    sidecar_names = source_index.sidecar_names(os.path.basename(file))
 
-    os.rename(source_file_path, dest_file_path)
+    stats = new_stats()
+    move_file(source_file_path, dest_file_path, stats=stats)
+    source_index.discard(os.path.basename(file))
 
     new_file_name = f"{movie_name}{os.path.splitext(file)[1]}"
     os.rename(dest_file_path, os.path.join(dir_structure, new_file_name))
+    dest_index.add(new_file_name)
+
+    # Subtitles travel with their video and keep their suffix (e.g. ".en.srt")
+    for sidecar_name in sidecar_names:
+        new_sidecar_name = movie_name + sidecar_suffix(sidecar_name, os.path.basename(file))
+        try:
+            move_file(os.path.join(os.path.dirname(file), sidecar_name),
+                      os.path.join(dir_structure, new_sidecar_name), stats=stats)
+            source_index.discard(sidecar_name)
+            dest_index.add(new_sidecar_name)
+            print(f"  → Moved subtitle: {new_sidecar_name}")
+        except OSError as e:
+            print(f"  → Could not move subtitle {sidecar_name}: {e}")
+    if stats['files']:
+        print(f"  → Copied across devices: {format_rate(stats)}")
     
     # Clean up unnecessary files in the movie directory
     print(f"  → Cleaning up extra files in movie folder...")
-    cleanup_directory(dir_structure, auto_delete=True)
+    cleanup_directory(dir_structure, auto_delete=True, ask_unknown=ask_unknown)
 
-    # Delete the now empty folders
+    # Delete the now empty folders; a concurrent move from the same folder
+    # may already have removed them, and the final sweep catches the rest
     parent_dir = os.path.dirname(source_file_path)
-    while parent_dir != folder_path and not os.listdir(parent_dir):
-        os.rmdir(parent_dir)
+    while parent_dir != folder_path:
+        try:
+            if os.listdir(parent_dir):
+                break
+            os.rmdir(parent_dir)
+        except OSError:
+            break
         parent_dir = os.path.dirname(parent_dir)
 
 # Function to get the root DVD folder
@@ -457,11 +494,24 @@ skipped_count = len(files) - len(visible_files)
 if skipped_count > 0:
     print(f"Skipping {skipped_count} hidden file(s)")
 
+# Subtitles that belong to a video are moved together with it
+sidecar_files = set()
+for directory in sorted({os.path.dirname(f) for f in visible_files}):
+    sidecar_files.update(get_index(directory).owned_sidecars())
+visible_files = [f for f in visible_files if f not in sidecar_files]
+if sidecar_files:
+    print(f"Grouped {len(sidecar_files)} subtitle file(s) with their videos")
+
 print(f"Processing {len(visible_files)} file(s)\n")
 
 # Track processed DVD folders to avoid duplicates
 processed_dvd_folders = set()
 
+# Confirmed moves run in the background so the next prompt never waits on NAS I/O.
+# Jobs are keyed on their destination and source folders, so a folder is only
+# cleaned up once the moves out of or into it have finished.
+move_queue = MoveQueue()
+
 # First, find and process all DVD folders
 print("Scanning for DVD folders...")
 dvd_folders = find_dvd_folders(folder_path)
@@ -473,8 +523,11 @@ if dvd_folders:
             continue
             
         print(f"\n{'='*60}")
+        if move_queue.status():
+            print(move_queue.status())
         print(f"DVD Folder detected: {os.path.basename(dvd_folder_root)}")
         print(f"Cleaning up extra files first...")
+        move_queue.wait_for(dvd_folder_root)
         cleanup_directory(dvd_folder_root, auto_delete=True)
         
         print(f"Searching for movie information...")
@@ -552,8 +605,11 @@ if dvd_folders:
             while True:
                 confirm = input("  Organize this DVD folder? (y/n/search): ").strip().lower()
                 if confirm == 'y':
-                    organize_dvd_folder(dvd_folder_root, movie_data, folder_path)
-                    print(f"✓ Organized: {os.path.basename(dvd_folder_root)}")
+                    move_queue.submit((get_destination_folder(movie_data, folder_path), dvd_folder_root),
+                                      os.path.basename(dvd_folder_root),
+                                      organize_dvd_folder, dvd_folder_root, movie_data, folder_path,
+                                      ask_unknown=False)
+                    print(f"→ Queued: {os.path.basename(dvd_folder_root)} (moving in background)")
                     processed_dvd_folders.add(dvd_folder_root)
                     break
                 elif confirm == 'n' or confirm == 'search':
@@ -626,8 +682,12 @@ for file in visible_files:
     # Clean up extra files in the parent directory first
     parent_dir = os.path.dirname(file)
     print(f"\n{'='*60}")
+    if move_queue.status():
+        print(move_queue.status())
     print(f"Original file: {original_file_name}")
     print(f"Cleaning up extra files in directory...")
+    # Queued moves may still be taking files out of (or into) this folder
+    move_queue.wait_for(parent_dir)
     cleanup_directory(parent_dir, auto_delete=True)
     
     print(f"Searching for movie: {movie_name}" + (f" ({year})" if year else ""))
@@ -673,8 +733,11 @@ for file in visible_files:
         while True:
             confirm = input("  Organize this file? (y/n/search): ").strip().lower()
             if confirm == 'y':
-                organize_movie(file, movie_data, folder_path)
-                print(f"✓ Organized: {os.path.basename(file)}")
+                move_queue.submit((get_destination_folder(movie_data, folder_path), parent_dir),
+                                  original_file_name,
+                                  organize_movie, file, movie_data, folder_path,
+                                  ask_unknown=False)
+                print(f"→ Queued: {original_file_name} (moving in background)")
                 break
             elif confirm == 'n' or confirm == 'search':
                 # Ask for IMDb ID
@@ -710,6 +773,17 @@ for file in visible_files:
     else:
         print(f"✗ Skipped: {original_file_name}")
 
+# Wait for every queued move before sweeping empty folders
+print("\nWaiting for background moves to finish...")
+move_failures = move_queue.wait()
+print()
+if move_failures:
+    print(f"✗ {len(move_failures)} move(s) failed:")
+    for description, error in move_failures:
+        print(f"  - {description}: {error}")
+else:
+    print("✓ All moves completed")
+
 print("\nCleaning up empty folders...")
 
 # Remove empty directories from bottom up
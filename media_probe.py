@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Cached media info probing.
+
+All fields the quality check needs (width, height, duration, codec) are read
+from the container headers in-process where possible (container_info), and
+otherwise from a single mediainfo invocation with JSON output, with several
+files probed per process. File size comes from os.stat. Results are cached on disk
+keyed by (path, size, mtime), so unchanged files are never probed twice.
+"""
+
+import atexit
+import json
+import os
+import subprocess
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from container_info import read_container_info
+
+CACHE_PATH = os.path.expanduser("~/.cache/film-file-organizer/media_info.json")
+PROBE_BATCH_SIZE = 32  # files per mediainfo process
+
+_cache = None
+_cache_dirty = False
+_cache_lock = threading.Lock()
+
+
+def _load_cache() -> Dict:
+    global _cache
+    if _cache is None:
+        try:
+            with open(CACHE_PATH, 'r', encoding='utf-8') as f:
+                _cache = json.load(f)
+        except (OSError, ValueError):
+            _cache = {}
+        atexit.register(save_cache)
+    return _cache
+
+
+def save_cache():
+    """Write the probe cache back to disk if anything changed."""
+    global _cache_dirty
+    with _cache_lock:
+        if _cache is None or not _cache_dirty:
+            return
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        tmp_path = CACHE_PATH + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(_cache, f)
+        os.replace(tmp_path, CACHE_PATH)
+        _cache_dirty = False
+
+
+def _empty_info(size: int = 0) -> Dict:
+    return {"resolution": 0, "width": 0, "height": 0, "duration": 0.0, "codec": "", "size": size}
+
+
+def _to_float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _parse_media(media: Dict, size: int) -> Dict:
+    info = _empty_info(size)
+    for track in media.get('track', []):
+        kind = track.get('@type')
+        if kind == 'General' and not info['duration']:
+            info['duration'] = _to_float(track.get('Duration'))
+        elif kind == 'Video' and not info['height']:
+            info['width'] = int(_to_float(track.get('Width')))
+            info['height'] = int(_to_float(track.get('Height')))
+            info['codec'] = track.get('Format', '')
+            info['duration'] = _to_float(track.get('Duration')) or info['duration']
+    info['resolution'] = info['height']
+    return info
+
+
+def _run_mediainfo(paths: List[str]) -> Dict[str, Dict]:
+    """Probe paths with one mediainfo process. Returns the media dicts by path."""
+    result = subprocess.run(
+        ["mediainfo", "--Output=JSON"] + paths,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    data = json.loads(result.stdout)
+    documents = data if isinstance(data, list) else [data]
+    media_list = [(doc or {}).get('media') or {} for doc in documents]
+    by_path = {media['@ref']: media for media in media_list if media.get('@ref')}
+    # Older mediainfo versions omit or rewrite @ref; output order matches input
+    if len(media_list) == len(paths):
+        for path, media in zip(paths, media_list):
+            by_path.setdefault(path, media)
+    return by_path
+
+
+def probe_files(paths: Iterable[str]) -> Dict[str, Optional[Dict]]:
+    """
+    Return {path: info} for every path.
+
+    info has resolution (height), width, height, duration (seconds), codec and
+    size. It is None when the file cannot be read or mediainfo is unavailable.
+    """
+    global _cache_dirty
+    results = {}
+    to_probe = []
+    stats = {}
+    with _cache_lock:
+        cache = _load_cache()
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            results[path] = None
+            continue
+        stats[path] = st
+        with _cache_lock:
+            entry = cache.get(path)
+        if entry and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime:
+            results[path] = entry['info']
+            continue
+        info = read_container_info(path)
+        if info is None:
+            to_probe.append(path)
+            continue
+        info['size'] = st.st_size
+        results[path] = info
+        with _cache_lock:
+            cache[path] = {'size': st.st_size, 'mtime': st.st_mtime, 'info': info}
+            _cache_dirty = True
+
+    for start in range(0, len(to_probe), PROBE_BATCH_SIZE):
+        batch = to_probe[start:start + PROBE_BATCH_SIZE]
+        try:
+            probed = _run_mediainfo(batch)
+        except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
+            for path in batch:
+                results[path] = None
+            continue
+        with _cache_lock:
+            for path in batch:
+                st = stats[path]
+                info = _parse_media(probed.get(path, {}), st.st_size)
+                results[path] = info
+                cache[path] = {'size': st.st_size, 'mtime': st.st_mtime, 'info': info}
+            _cache_dirty = True
+    return results
+
+
+def probe_file(path: str) -> Optional[Dict]:
+    return probe_files([path])[path]
@@ -2,11 +2,41 @@
 """
 Merge folders and remove the source folder after successful rsync completion.
 Allows user to choose between default paths or custom source/destination.
+
+Two merge engines are available:
+- rsync: a single rsync stream (default when source and destination are on
+  different volumes)
+- native: renames files when both sides are on the same volume, otherwise
+  copies with several concurrent streams (default on the same volume)
+
+Like rsync -a, the native engine keeps permissions and modification times of
+files and directories and recreates symlinks as symlinks. Unlike rsync -a it
+does not preserve owner/group (which needs root) and cannot copy devices,
+FIFOs or sockets across volumes; those are reported as failed files, so the
+source is never cleaned up behind them.
+
+Every run appends its files, bytes, elapsed time, throughput and slow files
+to ~/.local/share/film-file-organizer/merge_history.jsonl.
+
+Usage:
+    python merge_and_cleanup.py [--engine rsync|native] [--streams N] [--verify-checksums]
 """
 
+import argparse
+import errno
+import json
 import os
+import re
 import subprocess
 import shutil
+import stat
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from copy_engine import format_size, format_rate, copy_file, new_stats, same_device
+from file_hash import hash_files_per_device, HASH_NAME
 
 # Default paths
 DEFAULT_SOURCE = "/Volumes/Films/ToOrganise/"
@@ -17,6 +47,22 @@ CUSTOM_DESTINATION = "/Volumes/Films/Not Watched Yet"
 SOURCE = DEFAULT_SOURCE
 DESTINATION = DEFAULT_DESTINATION
 DELETE_SOURCE = False  # Track whether we should delete the source folder
+MTIME_TOLERANCE = 2  # seconds of mtime difference accepted when verifying
+HASH_WORKERS_PER_DEVICE = 4  # parallel checksum readers per disk
+NATIVE_STREAMS = 4  # concurrent copy streams for the native engine across volumes
+HISTORY_PATH = os.path.expanduser("~/.local/share/film-file-organizer/merge_history.jsonl")
+SLOW_FILE_FACTOR = 0.33  # files below this fraction of the median rate are reported as slow
+SLOW_FILE_MIN_BYTES = 10 * 1000**2  # ignore small files when looking for slow outliers
+
+# rsync -h prints sizes in units of 1000 with a K/M/G/T suffix
+_RSYNC_UNITS = {'': 1, 'K': 1000, 'M': 1000**2, 'G': 1000**3, 'T': 1000**4}
+# rsync >= 3.1 ends a finished file with "(xfr#N, to-chk=...)", macOS's rsync 2.6.9 with "(xfer#N, to-check=...)"
+_RSYNC_PROGRESS = re.compile(r'^\s+([\d.,]+)([KMGT]?)\s+100%\s+\S+\s+(\d+):(\d+):(\d+)\s+\(xf(?:e)?r#')
+_RSYNC_STATS = {
+    'files_transferred': re.compile(r'^Number of (?:regular )?files transferred:\s*([\d,]+)'),
+    'total_files': re.compile(r'^Number of files:\s*([\d,]+)'),
+    'bytes_transferred': re.compile(r'^Total transferred file size:\s*([\d.,]+)([KMGT]?) bytes'),
+}
 
 def check_paths_exist():
     """Verify both source and destination paths exist"""
@@ -30,14 +76,136 @@ def check_paths_exist():
     print(f"✓ Destination exists: {DESTINATION}")
     return True
 
-def count_files(path):
-    """Count total files in a directory tree"""
-    count = 0
-    for root, dirs, files in os.walk(path):
-        count += len(files)
-    return count
+def merge_target():
+    """Folder the source's contents end up in, following rsync's trailing-slash rule:
+    SOURCE/ merges its contents into DESTINATION, SOURCE without a slash
+    lands in DESTINATION/<name of SOURCE>."""
+    if SOURCE.endswith('/'):
+        return DESTINATION
+    return os.path.join(DESTINATION, os.path.basename(os.path.normpath(SOURCE)))
+
+def build_manifest(path):
+    """Record (relative path, size, mtime) for every file under path"""
+    manifest = []
+    stack = [path]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                else:
+                    st = entry.stat(follow_symlinks=False)
+                    manifest.append((os.path.relpath(entry.path, path), st.st_size, st.st_mtime))
+    return manifest
+
+def _rsync_number(value, unit=''):
+    return int(float(value.replace(',', '')) * _RSYNC_UNITS[unit])
+
+def parse_rsync_output(lines):
+    """Turn rsync -v --progress --stats output into a metrics dict"""
+    metrics = {'files_transferred': 0, 'total_files': 0, 'bytes_transferred': 0, 'files': []}
+    current_file = None
+    for line in lines:
+        progress = _RSYNC_PROGRESS.match(line)
+        if progress:
+            size, unit, hours, minutes, seconds = progress.groups()
+            elapsed = int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+            metrics['files'].append({'path': current_file, 'bytes': _rsync_number(size, unit),
+                                     'seconds': elapsed})
+            continue
+        for key, pattern in _RSYNC_STATS.items():
+            match = pattern.match(line)
+            if match:
+                metrics[key] = _rsync_number(*match.groups())
+                break
+        else:
+            if line and not line[0].isspace() and not line.startswith(('sending ', 'sent ', 'total size ')):
+                current_file = line.rstrip('/')
+    return metrics
+
+def find_slow_files(files):
+    """Files transferred well below the median rate of the run"""
+    rates = sorted(f['bytes'] / max(f['seconds'], 1) for f in files if f['bytes'] >= SLOW_FILE_MIN_BYTES)
+    if len(rates) < 3:
+        return []
+    median = rates[len(rates) // 2]
+    slow = []
+    for f in files:
+        rate = f['bytes'] / max(f['seconds'], 1)
+        if f['bytes'] >= SLOW_FILE_MIN_BYTES and rate < median * SLOW_FILE_FACTOR:
+            slow.append(dict(f, bytes_per_sec=round(rate)))
+    return sorted(slow, key=lambda f: f['bytes_per_sec'])[:10]
+
+def record_run(metrics):
+    """Append a merge run to the JSONL history and show the recent throughput trend"""
+    files = metrics.pop('files', [])
+    elapsed = metrics.get('elapsed_seconds', 0)
+    metrics['throughput_bytes_per_sec'] = round(metrics['bytes_transferred'] / elapsed) if elapsed else 0
+    metrics['slow_files'] = find_slow_files(files)
+    
+    print(f"\n{'='*60}")
+    print("Transfer metrics")
+    print(f"{'='*60}")
+    print(f"Files transferred: {metrics['files_transferred']}")
+    print(f"Bytes transferred: {format_size(metrics['bytes_transferred'])}")
+    print(f"Elapsed: {elapsed:.1f}s")
+    print(f"Throughput: {format_size(metrics['throughput_bytes_per_sec'])}/s")
+    for f in metrics['slow_files']:
+        print(f"  ⚠ Slow: {f['path']} ({format_size(f['bytes_per_sec'])}/s)")
+    
+    try:
+        os.makedirs(os.path.dirname(HISTORY_PATH), exist_ok=True)
+        with open(HISTORY_PATH, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(metrics, ensure_ascii=False) + "\n")
+        with open(HISTORY_PATH, 'r', encoding='utf-8') as f:
+            history = [json.loads(line) for line in f if line.strip()]
+    except (OSError, ValueError) as e:
+        print(f"✗ Could not update run history: {e}")
+        return
+    
+    recent = [run for run in history if run.get('destination') == metrics['destination']
+              and run.get('bytes_transferred')][-5:]
+    if len(recent) > 1:
+        print(f"\nRecent runs to {metrics['destination']}:")
+        for run in recent:
+            print(f"  {run['timestamp']}  {run['engine']:<6}  {format_size(run['bytes_transferred']):>10}"
+                  f"  {format_size(run['throughput_bytes_per_sec'])}/s")
+    print(f"History: {HISTORY_PATH}")
 
-def rsync_merge():
+def new_metrics(engine):
+    return {
+        'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'engine': engine,
+        'source': SOURCE,
+        'destination': DESTINATION,
+        'success': False,
+        'files_transferred': 0,
+        'total_files': 0,
+        'bytes_transferred': 0,
+        'elapsed_seconds': 0.0,
+        'files': [],
+    }
+
+def _run_streaming(cmd):
+    """Run cmd, passing its output through to the terminal while capturing lines"""
+    lines = []
+    pending = b''
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE)
+    while True:
+        chunk = proc.stdout.read1(65536)
+        if not chunk:
+            break
+        sys.stdout.buffer.write(chunk)
+        sys.stdout.flush()
+        # --progress redraws with \r, so split on both
+        *complete, pending = re.split(rb'[\r\n]', pending + chunk)
+        lines.extend(line.decode('utf-8', 'replace') for line in complete if line)
+    if pending:
+        lines.append(pending.decode('utf-8', 'replace'))
+    return proc.wait(), lines
+
+def rsync_merge(metrics=None):
     """Merge source into destination using rsync"""
     print(f"\n{'='*60}")
     print("Starting rsync merge...")
@@ -55,33 +223,279 @@ def rsync_merge():
     
     print(f"Command: {' '.join(cmd)}\n")
     
+    start = time.monotonic()
     try:
-        result = subprocess.run(cmd, check=True)
-        print(f"\n✓ rsync completed successfully")
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"\n✗ rsync failed with exit code {e.returncode}")
-        return False
+        returncode, lines = _run_streaming(cmd)
     except Exception as e:
         print(f"\n✗ Error running rsync: {e}")
         return False
+    
+    if metrics is not None:
+        metrics.update(parse_rsync_output(lines))
+        metrics['elapsed_seconds'] = round(time.monotonic() - start, 1)
+        metrics['success'] = returncode == 0
+    
+    if returncode != 0:
+        print(f"\n✗ rsync failed with exit code {returncode}")
+        return False
+    print(f"\n✓ rsync completed successfully")
+    return True
+
+def _is_identical(dest_path, size, mtime):
+    """rsync's quick check: same size and modification time"""
+    try:
+        st = os.lstat(dest_path)
+    except OSError:
+        return False
+    return (stat.S_ISREG(st.st_mode) and st.st_size == size
+            and abs(st.st_mtime - mtime) <= MTIME_TOLERANCE)
+
+def _same_link(source_path, dest_path):
+    """True when dest_path is a symlink pointing where source_path points"""
+    try:
+        return os.path.islink(dest_path) and os.readlink(dest_path) == os.readlink(source_path)
+    except OSError:
+        return False
+
+def _copy_symlink(source_path, dest_path):
+    """Recreate a symlink (not its target) at dest_path, as rsync -a does"""
+    link_target = os.readlink(source_path)
+    if os.path.lexists(dest_path):
+        os.remove(dest_path)
+    os.symlink(link_target, dest_path)
+    st = os.lstat(source_path)
+    if os.utime in os.supports_follow_symlinks:
+        os.utime(dest_path, ns=(st.st_atime_ns, st.st_mtime_ns), follow_symlinks=False)
+
+def _copy_directory_attributes(directories, target):
+    """Apply source permissions and times to the merged directories, deepest
+    first, after their contents are written (writing them changed the times)"""
+    failures = 0
+    for relative, st in sorted(directories, key=lambda item: item[0].count(os.sep), reverse=True):
+        path = os.path.join(target, relative)
+        try:
+            os.chmod(path, stat.S_IMODE(st.st_mode))
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        except OSError as e:
+            failures += 1
+            print(f"  ⚠ Could not set attributes of {relative or target}: {e}")
+    return failures
 
-def verify_merge():
-    """Verify that files were copied"""
-    source_count = count_files(SOURCE)
-    dest_count = count_files(DESTINATION)
+def native_merge(streams=NATIVE_STREAMS, metrics=None):
+    """Merge source into destination without rsync.
+    Same volume: every file is renamed into place (no data copied).
+    Different volumes: files are copied with `streams` concurrent copies.
+    Like rsync -a, files that already match by size/mtime are skipped and
+    differing destination files are replaced; nothing else at the
+    destination is touched. Symlinks are recreated as symlinks, and
+    directory permissions and times are applied once their contents are in
+    place (see the module docstring for what -a keeps that this does not)."""
+    print(f"\n{'='*60}")
+    print("Starting native merge...")
+    print(f"{'='*60}")
+    
+    target = merge_target()
+    rename = same_device(SOURCE, DESTINATION)
+    print(f"Mode: {'rename (same volume)' if rename else f'copy ({streams} streams)'}")
+    print(f"Into: {target}\n")
+    
+    # One scandir pass over the source: directories to create (with the
+    # attributes to give them afterwards), files and symlinks to move
+    directories = []
+    files = []
+    links = set()
+    stack = ['']
+    try:
+        directories.append(('', os.stat(SOURCE)))
+        while stack:
+            relative_dir = stack.pop()
+            with os.scandir(os.path.join(SOURCE, relative_dir)) as it:
+                for entry in it:
+                    relative = os.path.join(relative_dir, entry.name)
+                    st = entry.stat(follow_symlinks=False)
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.append((relative, st))
+                        stack.append(relative)
+                    else:
+                        if entry.is_symlink():
+                            links.add(relative)
+                        files.append((relative, st.st_size, st.st_mtime))
+        os.makedirs(target, exist_ok=True)
+        for relative, _ in directories:
+            os.makedirs(os.path.join(target, relative), exist_ok=True)
+    except OSError as e:
+        print(f"\n✗ Error scanning source: {e}")
+        return False
+    
+    stats = new_stats()
+    stats_lock = threading.Lock()
+    copied = []
+    skipped = 0
+    failed = []
+    start = time.monotonic()
+    
+    def transfer(item):
+        relative, size, mtime = item
+        src = os.path.join(SOURCE, relative)
+        dst = os.path.join(target, relative)
+        if rename:
+            try:
+                os.replace(src, dst)
+                with stats_lock:
+                    stats['renamed'] += 1
+                return
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+        if relative in links:
+            _copy_symlink(src, dst)
+            with stats_lock:
+                stats['files'] += 1
+            return
+        if not stat.S_ISREG(os.lstat(src).st_mode):
+            raise OSError(errno.ENOTSUP, "not a regular file or symlink, cannot be copied")
+        item_stats = new_stats()
+        copy_file(src, dst, stats=item_stats)
+        with stats_lock:
+            stats['files'] += 1
+            stats['bytes'] += item_stats['bytes']
+            copied.append({'path': relative, 'bytes': item_stats['bytes'],
+                           'seconds': round(item_stats['seconds'], 3)})
+    
+    pending = []
+    for item in files:
+        relative, size, mtime = item
+        dst = os.path.join(target, relative)
+        if (_same_link(os.path.join(SOURCE, relative), dst) if relative in links
+                else _is_identical(dst, size, mtime)):
+            skipped += 1
+        else:
+            pending.append(item)
     
+    with ThreadPoolExecutor(max_workers=1 if rename else max(1, streams)) as executor:
+        futures = [(item, executor.submit(transfer, item)) for item in pending]
+        try:
+            for done, (item, future) in enumerate(futures, 1):
+                try:
+                    future.result()
+                    print(f"  [{done}/{len(futures)}] {item[0]}")
+                except OSError as e:
+                    failed.append(item[0])
+                    print(f"  ✗ [{done}/{len(futures)}] {item[0]}: {e}")
+        except KeyboardInterrupt:
+            # Only the files already being copied are finished
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+    
+    _copy_directory_attributes(directories, target)
+    stats['seconds'] = time.monotonic() - start
+    if metrics is not None:
+        metrics.update({
+            'success': not failed,
+            'files_transferred': stats['files'] + stats['renamed'],
+            'total_files': len(files),
+            'bytes_transferred': stats['bytes'],
+            'elapsed_seconds': round(stats['seconds'], 1),
+            'renamed': stats['renamed'],
+            'files': copied,
+        })
+    print(f"\nTransferred: {format_rate(stats)}")
+    print(f"Already identical (skipped): {skipped}")
+    if failed:
+        print(f"\n✗ Native merge failed for {len(failed)} file(s)")
+        return False
+    print(f"\n✓ Native merge completed successfully")
+    return True
+
+def verify_merge(manifest):
+    """Verify that every file in the source manifest arrived at the destination.
+    Only the manifest paths are checked, so this takes time proportional to the
+    merge, not to the size of the destination library."""
     print(f"\n{'='*60}")
     print("Verifying merge...")
     print(f"{'='*60}")
-    print(f"Files in source: {source_count}")
-    print(f"Files in destination: {dest_count}")
+    print(f"Files in source manifest: {len(manifest)}")
     
-    if source_count == 0:
+    if not manifest:
         print("✓ Source is empty (nothing to merge)")
         return True
     
-    return True  # Allow cleanup even if counts differ
+    target = merge_target()
+    missing = []
+    mismatched = []
+    for relative, size, mtime in manifest:
+        try:
+            # The manifest records symlinks themselves, not their targets
+            st = os.lstat(os.path.join(target, relative))
+        except OSError:
+            missing.append(relative)
+            continue
+        if stat.S_ISLNK(st.st_mode):
+            # A symlink's size is the length of its target; not every rsync keeps link mtimes
+            if st.st_size != size:
+                mismatched.append(relative)
+        # rsync -a preserves mtime; allow for FAT/SMB timestamp granularity
+        elif st.st_size != size or abs(st.st_mtime - mtime) > MTIME_TOLERANCE:
+            mismatched.append(relative)
+    
+    print(f"Verified at destination: {len(manifest) - len(missing) - len(mismatched)}")
+    if missing or mismatched:
+        print(f"✗ Missing at destination: {len(missing)}")
+        for relative in missing[:20]:
+            print(f"    {relative}")
+        print(f"✗ Size/mtime mismatch: {len(mismatched)}")
+        for relative in mismatched[:20]:
+            print(f"    {relative}")
+        return False
+    
+    print("✓ All source files present at destination")
+    return True
+
+def verify_checksums(manifest):
+    """Hash source and destination copies of the merged files and compare them"""
+    print(f"\n{'='*60}")
+    print(f"Verifying file contents ({HASH_NAME})...")
+    print(f"{'='*60}")
+    
+    # Files the native engine renamed into place no longer exist in the source
+    # and are identical by construction
+    present = [(relative, size) for relative, size, _ in manifest
+               if os.path.lexists(os.path.join(SOURCE, relative))]
+    if len(present) < len(manifest):
+        print(f"Moved by rename (not re-read): {len(manifest) - len(present)}")
+    target = merge_target()
+    # Symlinks are compared by where they point, not by the content behind them
+    links = {relative for relative, _ in present if os.path.islink(os.path.join(SOURCE, relative))}
+    present = [(relative, size) for relative, size in present if relative not in links]
+    wrong_links = []
+    for relative in sorted(links):
+        try:
+            if os.readlink(os.path.join(SOURCE, relative)) != os.readlink(os.path.join(target, relative)):
+                wrong_links.append(os.path.join(SOURCE, relative))
+        except OSError:
+            wrong_links.append(os.path.join(SOURCE, relative))
+    pairs = [(os.path.join(SOURCE, relative), os.path.join(target, relative))
+             for relative, _ in present]
+    total_bytes = 2 * sum(size for _, size in present)
+    
+    start = time.monotonic()
+    digests = hash_files_per_device([path for pair in pairs for path in pair],
+                                    workers_per_device=HASH_WORKERS_PER_DEVICE)
+    elapsed = time.monotonic() - start
+    
+    mismatched = wrong_links + [source for source, dest in pairs
+                                if digests[source] is None or digests[source] != digests[dest]]
+    rate = total_bytes / elapsed if elapsed > 0 else 0
+    print(f"Hashed {format_size(total_bytes)} in {elapsed:.1f}s ({rate / (1024**2):.1f} MB/s)")
+    
+    if mismatched:
+        print(f"✗ Content differs or unreadable: {len(mismatched)}")
+        for path in mismatched[:20]:
+            print(f"    {os.path.relpath(path, SOURCE)}")
+        return False
+    
+    print(f"✓ All {len(pairs)} files match" + (f", {len(links)} symlink(s) point to the same place" if links else ""))
+    return True
 
 def cleanup_source(skip_confirm=False, delete_source=False):
     """Remove the source folder after successful merge (only if specified)"""
@@ -164,8 +578,10 @@ def get_user_paths():
         print("✗ Invalid choice, using default")
         return DEFAULT_SOURCE, DEFAULT_DESTINATION, False
 
-def main(skip_confirm=False):
-    """Main function to merge folders. Set skip_confirm=True for non-interactive use."""
+def main(skip_confirm=False, check_contents=None, engine=None, streams=NATIVE_STREAMS):
+    """Main function to merge folders. Set skip_confirm=True for non-interactive use.
+    check_contents=True hashes both copies before the source is deleted; None asks.
+    engine is 'rsync' or 'native'; None picks native on the same volume, else rsync."""
     global SOURCE, DESTINATION, DELETE_SOURCE
     
     print("Film File Merger - Merge folders\n")
@@ -176,6 +592,8 @@ def main(skip_confirm=False):
     print(f"\n{'='*60}")
     print(f"Source: {SOURCE}")
     print(f"Destination: {DESTINATION}")
+    if merge_target() != DESTINATION:
+        print(f"  (source folder itself is merged in: {merge_target()})")
     print(f"Delete source: {DELETE_SOURCE}")
     print(f"{'='*60}")
     
@@ -183,8 +601,13 @@ def main(skip_confirm=False):
     if not check_paths_exist():
         raise RuntimeError("Paths do not exist")
     
-    # Step 2: Show initial file counts
-    source_files = count_files(SOURCE)
+    if engine is None:
+        engine = 'native' if same_device(SOURCE, DESTINATION) else 'rsync'
+    print(f"Merge engine: {engine}")
+    
+    # Step 2: Capture a manifest of the source (also gives the file count)
+    manifest = build_manifest(SOURCE)
+    source_files = len(manifest)
     print(f"\nFiles to merge: {source_files}")
     
     if source_files == 0:
@@ -197,13 +620,27 @@ def main(skip_confirm=False):
         if response != 'yes':
             print("✗ Merge cancelled")
             return False
+        if check_contents is None:
+            response = input("Verify file contents with checksums before cleanup? (yes/no): ").strip().lower()
+            check_contents = response == 'yes'
     
-    # Step 4: Run rsync
-    if not rsync_merge():
-        raise RuntimeError("rsync failed")
+    # Step 4: Run the merge and record its throughput
+    metrics = new_metrics(engine)
+    if engine == 'native':
+        merged = native_merge(streams=streams, metrics=metrics)
+    else:
+        merged = rsync_merge(metrics=metrics)
+    record_run(metrics)
+    if not merged:
+        raise RuntimeError(f"{engine} merge failed")
     
-    # Step 5: Verify the merge
-    verify_merge()
+    # Step 5: Verify the merge; never delete the source if anything is missing
+    if not verify_merge(manifest):
+        print("\n⚠ Merge verification failed - source folder was not removed")
+        return False
+    if check_contents and not verify_checksums(manifest):
+        print("\n⚠ Checksum verification failed - source folder was not removed")
+        return False
     
     # Step 6: Cleanup source
     if not cleanup_source(skip_confirm=skip_confirm, delete_source=DELETE_SOURCE):
@@ -218,4 +655,12 @@ def main(skip_confirm=False):
     return True
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Merge folders and clean up the source.")
+    parser.add_argument("--engine", choices=["rsync", "native"],
+                        help="merge engine (default: native on the same volume, rsync otherwise)")
+    parser.add_argument("--streams", type=int, default=NATIVE_STREAMS,
+                        help=f"concurrent copy streams for the native engine (default: {NATIVE_STREAMS})")
+    parser.add_argument("--verify-checksums", action="store_true",
+                        help="hash source and destination copies before the source is deleted")
+    args = parser.parse_args()
+    main(check_contents=True if args.verify_checksums else None, engine=args.engine, streams=args.streams)
@@ -6,131 +6,111 @@ Use case: Synology NAS shares mounted on macOS where NFC (composed) names are
 invisible or duplicated under NFD (decomposed) form.
 
 Behaviors:
-- Detect items whose name changes when normalized to NFD.
-- Plan renames to NFD.
-- If the NFD target already exists, merge contents without overwriting; file
-  conflicts are suffixed with " (duplicate N)".
+- Detect items, at any depth, whose name changes when normalized to NFD
+  (or NFC with --nfc).
+- Plan renames and apply them deepest first.
+- Collisions (an NFD twin already exists, or several names only differ in
+  form) are found from each directory listing and resolved before any
+  rename: directories merge into the twin without overwriting; files get a
+  " (duplicate N)" suffix.
 - Dry-run by default; apply with --fix.
+- --workers N plans and applies N director folders at a time (each one
+  strictly deepest first); top-level renames and merges run last.
 
 Usage:
     python merge_normalize_unicode.py /Volumes/Films-1/AJ          # preview
     python merge_normalize_unicode.py /Volumes/Films-1/AJ --fix    # apply
+    python merge_normalize_unicode.py /Volumes/Films-1/AJ --nfc    # preview NFD -> NFC
+    python merge_normalize_unicode.py /Volumes/Films-1/AJ --fix --workers 8
 """
 
 import os
 import sys
-import unicodedata
-import shutil
-from typing import List, Dict
+import time
+from typing import List, Dict, Set
 
+from copy_engine import merge_tree, unique_name, name_key
+from unicode_normalize import plan_renames, apply_renames, collision_groups, print_progress
 
-def normalize_name(name: str) -> str:
-    return unicodedata.normalize('NFD', name)
 
+def plan_operations(folder: str, form: str = 'NFD', workers: int = 1) -> List[Dict]:
+    """
+    Renames for every non-hidden item below folder, at any depth, with every
+    collision decided up front.
 
-def list_items(folder: str) -> List[str]:
-    return [i for i in os.listdir(folder) if not i.startswith('.')]
-
-
-def plan_operations(folder: str) -> List[Dict]:
-    ops = []
-    for name in list_items(folder):
-        normalized = normalize_name(name)
-        if normalized != name:
-            ops.append({
-                'original': name,
-                'normalized': normalized,
-                'src': os.path.join(folder, name),
-                'dst': os.path.join(folder, normalized),
-                'is_dir': os.path.isdir(os.path.join(folder, name))
-            })
+    Each op gets an 'action': 'rename' (to op['dst']) or 'merge' (directory
+    into the twin that holds or will receive the normalized name).
+    """
+    ops = plan_renames(folder, form=form, workers=workers)
+    for op in ops:
+        op['action'] = 'rename'
+    taken_by_directory = {}
+    for group in collision_groups(ops).values():
+        directory = group[0]['directory']
+        if directory not in taken_by_directory:
+            taken_by_directory[directory] = {name_key(n) for n in group[0]['listing']}
+        decide_collision(group, taken_by_directory[directory])
     return ops
 
 
-def ensure_dir(path: str, dry_run: bool):
-    if os.path.exists(path):
-        return
-    if dry_run:
-        print(f"[DRY] mkdir: {path}")
+def decide_collision(group: List[Dict], taken: Set[str]):
+    """
+    Resolve one collision group from the listing alone.
+
+    If an entry already has the normalized name it keeps it; otherwise the
+    first planned entry is renamed to it. Directories then merge into that
+    holder when it is a directory; everything else gets a
+    " (duplicate N)" name, reserved in taken.
+    """
+    group = sorted(group, key=lambda op: op['original'])
+    normalized = group[0]['normalized']
+    if group[0]['target_exists']:
+        holder_is_dir = group[0]['twins'][normalized]
     else:
-        os.makedirs(path, exist_ok=True)
-
-
-def resolve_file_conflict(dst: str) -> str:
-    base, ext = os.path.splitext(dst)
-    counter = 1
-    candidate = dst
-    while os.path.exists(candidate):
-        candidate = f"{base} (duplicate {counter}){ext}"
-        counter += 1
-    return candidate
-
-
-def merge_directory(src: str, dst: str, dry_run: bool):
-    ensure_dir(dst, dry_run)
-    for entry in list_items(src):
-        src_path = os.path.join(src, entry)
-        dst_path = os.path.join(dst, entry)
-        if os.path.isdir(src_path):
-            merge_directory(src_path, dst_path, dry_run)
+        holder_is_dir = group[0]['is_dir']
+        group = group[1:]  # first one is a plain rename
+
+    for op in group:
+        if op['is_dir'] and holder_is_dir:
+            op['action'] = 'merge'
         else:
-            final_dst = dst_path if not os.path.exists(dst_path) else resolve_file_conflict(dst_path)
-            if dry_run:
-                print(f"[DRY] move file: {src_path} -> {final_dst}")
-            else:
-                shutil.move(src_path, final_dst)
-    # remove empty src
-    if dry_run:
-        print(f"[DRY] rmdir: {src}")
-    else:
-        try:
-            os.rmdir(src)
-        except OSError:
-            pass  # non-empty or permission issues
+            final_name = unique_name(normalized, taken)
+            taken.add(name_key(final_name))
+            op['dst'] = os.path.join(op['directory'], final_name)
 
 
 def apply_operation(op: Dict, dry_run: bool):
     src = op['src']
     dst = op['dst']
-    if not os.path.exists(src):
-        print(f"[SKIP] Missing source: {src}")
-        return
-
-    if op['is_dir']:
-        if os.path.exists(dst):
-            print(f"[MERGE] {src} -> {dst}")
-            merge_directory(src, dst, dry_run)
-        else:
-            if dry_run:
-                print(f"[DRY] rename dir: {src} -> {dst}")
-            else:
-                os.rename(src, dst)
+    if op['action'] == 'merge':
+        print(f"[MERGE] {src} -> {dst}")
+        merge_tree(src, dst, conflict='duplicate', dry_run=dry_run, include_hidden=False)
+    elif dry_run:
+        print(f"[DRY] rename {'dir' if op['is_dir'] else 'file'}: {src} -> {dst}")
     else:
-        final_dst = dst if not os.path.exists(dst) else resolve_file_conflict(dst)
-        if dry_run:
-            print(f"[DRY] rename file: {src} -> {final_dst}")
-        else:
-            os.rename(src, final_dst)
+        os.rename(src, dst)
 
 
 def main():
     if len(sys.argv) < 2:
-        print("Usage: python merge_normalize_unicode.py <folder> [--fix]")
+        print("Usage: python merge_normalize_unicode.py <folder> [--fix] [--nfc] [--workers N]")
         sys.exit(1)
 
     folder = sys.argv[1]
     fix_mode = '--fix' in sys.argv
+    form = 'NFC' if '--nfc' in sys.argv else 'NFD'
+    workers = int(sys.argv[sys.argv.index('--workers') + 1]) if '--workers' in sys.argv else 1
 
     if not os.path.isdir(folder):
         print(f"Error: folder not found: {folder}")
         sys.exit(1)
 
-    ops = plan_operations(folder)
+    ops = plan_operations(folder, form, workers)
     if not ops:
         print("✓ No items need normalization.")
         sys.exit(0)
 
-    print(f"Found {len(ops)} items needing normalization (top-level).")
+    print(f"Found {len(ops)} items needing normalization to {form}.")
     for op in ops[:10]:
         print(f"  {op['original']} -> {op['normalized']}")
     if len(ops) > 10:
@@ -140,8 +120,7 @@ def main():
         print("\nPreview mode: no changes made. Use --fix to apply.")
         # Show planned actions
         for op in ops[:20]:
-            note = "merge" if os.path.exists(op['dst']) else "rename"
-            print(f"[PLAN] {note}: {op['src']} -> {op['dst']}")
+            print(f"[PLAN] {op['action']}: {op['src']} -> {op['dst']}")
         if len(ops) > 20:
             print(f"[PLAN] ...{len(ops) - 20} more")
         sys.exit(0)
@@ -151,8 +130,13 @@ def main():
         print("Cancelled.")
         sys.exit(0)
 
-    for op in ops:
-        apply_operation(op, dry_run=False)
+    start = time.monotonic()
+    succeeded, failures = apply_renames(ops, apply_operation, workers=workers,
+                                        progress=print_progress if workers > 1 else None)
+    for op, e in failures:
+        print(f"✗ Error: {op['src']}: {e}")
+    print(f"\n{succeeded} renamed/merged, {len(failures)} failed in "
+          f"{time.monotonic() - start:.1f}s ({workers} worker(s))")
 
     print("\n✓ Done. Re-run in preview to verify.")
 
@@ -1,147 +1,388 @@
 import os
+import argparse
+import json
+import time
 import subprocess
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from copy_engine import device_of, same_device, move_file, measure_write_throughput, format_size
+from media_probe import probe_files, save_cache
+from sidecar_index import SidecarIndex
+
+TRANSFER_ATTEMPTS = 2  # failed files are retried once before being reported
 
 def get_video_info(filepath):
-    """Gets video quality (height) and file size from a file using mediainfo."""
-    info = {"resolution": 0, "size": 0}
+    """Gets video quality (height) and file size from the container headers (mediainfo as fallback)."""
+    return get_video_infos([filepath])[filepath]
+
+def get_video_infos(filepaths, log=print):
+    """Gets video info for several files with one (cached) mediainfo run."""
+    infos = {}
+    for filepath, info in probe_files(filepaths).items():
+        if info is None:
+            log(f"Error reading metadata from {filepath}. Skipping.")
+            info = {"resolution": 0, "size": 0}
+        infos[filepath] = info
+    return infos
+
+def plan_folder(source_folder, destination_root, log=print):
+    """Probes a film folder and decides replace/skip/move/new-folder for each video.
+
+    Returns a list of action dicts; nothing is moved yet.
+    """
+    actions = []
+
+    # Extract director and film folder name from source path
+    director_folder = os.path.basename(os.path.dirname(source_folder))
+    film_folder = os.path.basename(source_folder)
+    source_root = os.path.dirname(os.path.dirname(source_folder))
+
+    # Construct the potential destination folder path
+    dest_folder = os.path.join(destination_root, director_folder, film_folder)
+    dest_folder_exists = os.path.exists(dest_folder)
+
+    # One listing per folder; subtitles are looked up in the indexes
+    source_index = SidecarIndex(source_folder)
+    dest_index = SidecarIndex(dest_folder) if dest_folder_exists else SidecarIndex(dest_folder, names=[])
+
+    videos = [filename for filename in source_index.videos()
+              if filename.lower().endswith((".mkv", ".mp4", ".avi"))]
+
+    # Probe every video that needs comparing, source and destination, in one batch
+    compared = [filename for filename in videos if filename in dest_index]
+    infos = {}
+    if compared:
+        infos = get_video_infos([os.path.join(folder, filename)
+                                 for filename in compared
+                                 for folder in (source_folder, dest_folder)], log=log)
+
+    for filename in videos:
+        source_filepath = os.path.join(source_folder, filename)
+        dest_filepath = os.path.join(dest_folder, filename)
+        sidecar_names = source_index.sidecar_names(filename)
+        action = {
+            "action": "new_folder",
+            "filename": filename,
+            "source": source_filepath,
+            "dest": dest_filepath,
+            "dest_folder": dest_folder,
+            "source_root": source_root,
+            "dest_root": destination_root,
+            "relative_folder": os.path.join(director_folder, film_folder),
+            "srt_files": [os.path.join(source_folder, name) for name in sidecar_names],
+            # Destination subtitles a replacement would overwrite
+            "replaced_srt_files": [os.path.join(dest_folder, name) for name in sidecar_names if name in dest_index],
+        }
+
+        if filename in dest_index:
+            source_info = infos[source_filepath]
+            dest_info = infos[dest_filepath]
+
+            log(f"Comparing {filename}:")
+            log(f"  Source: {source_info['resolution']}p, {source_info['size']} bytes")
+            log(f"  Destination: {dest_info['resolution']}p, {dest_info['size']} bytes")
+
+            if source_info["resolution"] > dest_info["resolution"] or (source_info["resolution"] == dest_info["resolution"] and source_info["size"] > dest_info["size"]):
+                action["action"] = "replace"
+            else:
+                action["action"] = "skip"
+                action["replaced_srt_files"] = []
+        elif dest_folder_exists:
+            action["action"] = "move"
+
+        actions.append(action)
+    return actions
+
+def _transfer_succeeded(source, destination, expected_size):
+    """A file counts as moved once it is gone from the source and complete at the destination."""
+    if os.path.exists(source):
+        return False
+    try:
+        return os.path.getsize(destination) == expected_size
+    except OSError:
+        return False
+
+def _rsync_batch(source_root, dest_root, relative_paths):
+    """Moves relative_paths from source_root to dest_root with a single rsync run."""
+    with tempfile.NamedTemporaryFile("w", suffix=".files", delete=False) as files_from:
+        files_from.write("\n".join(relative_paths) + "\n")
     try:
         result = subprocess.run(
-            ["mediainfo", "--Inform=Video;%Height%", filepath],
-            capture_output=True,
-            text=True,
-            check=True,
-        )
-        info["resolution"] = int(result.stdout.strip())
-        result = subprocess.run(
-            ["mediainfo", "--Inform=General;%FileSize%", filepath],
+            ["rsync", "-a", "--remove-source-files", f"--files-from={files_from.name}",
+             os.path.join(source_root, ""), os.path.join(dest_root, "")],
             capture_output=True,
             text=True,
-            check=True,
         )
-        info["size"] = int(result.stdout.strip())
-    except (subprocess.CalledProcessError, FileNotFoundError, ValueError):
-        print(f"Error reading metadata from {filepath}. Skipping.")
-    return info
-
-def find_srt_files(directory, base_filename):
-    """Finds SRT subtitle files in a directory."""
-    srt_files = []
-    for filename in os.listdir(directory):
-        if filename.lower().endswith(".srt") and filename.lower().startswith(base_filename.lower()):
-            srt_files.append(os.path.join(directory, filename))
-    return srt_files
-
-def process_folders(source_folder, destination_root):
-    """Processes video files and subtitles between source and destination, searching in subfolders."""
+        return result.stderr.strip() if result.returncode != 0 else ""
+    finally:
+        os.remove(files_from.name)
+
+def _local_batch(source_root, dest_root, relative_paths):
+    """In-process mover for a source/destination pair on the same volume."""
+    errors = []
+    for relative in relative_paths:
+        destination = os.path.join(dest_root, relative)
+        try:
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            move_file(os.path.join(source_root, relative), destination)
+        except OSError as e:
+            errors.append(f"{relative}: {e}")
+    return "; ".join(errors)
+
+def transfer_files(items):
+    """Moves (source_root, dest_root, relative_path) items in bulk.
+
+    Items are grouped per source/destination root pair: one rsync
+    --files-from run per pair, or in-process renames when both roots are on
+    the same volume. Each file is checked afterwards; failures are retried
+    and never removed from the source. Returns {relative_path: error or None}.
+    """
+    expected = {}
+    results = {}
+    remaining = []
+    for source_root, dest_root, relative in items:
+        try:
+            expected[relative] = os.path.getsize(os.path.join(source_root, relative))
+        except OSError as e:
+            results[relative] = str(e)
+            continue
+        remaining.append((source_root, dest_root, relative))
 
-    for filename in os.listdir(source_folder):
-        if filename.lower().endswith((".mkv", ".mp4", ".avi")):
-            source_filepath = os.path.join(source_folder, filename)
-
-            # Extract director and film folder name from source path
-            director_folder = os.path.basename(os.path.dirname(source_folder))
-            film_folder = os.path.basename(source_folder)
-
-            # Construct the potential destination folder path
-            dest_folder = os.path.join(destination_root, director_folder, film_folder)
-
-            if os.path.exists(dest_folder):
-                dest_filepath = os.path.join(dest_folder, filename)
-
-                if os.path.exists(dest_filepath):
-                    source_info = get_video_info(source_filepath)
-                    dest_info = get_video_info(dest_filepath)
-
-                    print(f"Comparing {filename}:")
-                    print(f"  Source: {source_info['resolution']}p, {source_info['size']} bytes")
-                    print(f"  Destination: {dest_info['resolution']}p, {dest_info['size']} bytes")
-
-                    if source_info["resolution"] > dest_info["resolution"] or (source_info["resolution"] == dest_info["resolution"] and source_info["size"] > dest_info["size"]):
-                        try:
-                            subprocess.run(
-                                ["rsync", "-av", "--remove-source-files", source_filepath, dest_filepath],
-                                check=True,
-                            )
-                            print(f"Replaced {filename} in {dest_folder} with higher quality/size version.")
-
-                            base_filename = os.path.splitext(filename)[0]
-                            source_srt_files = find_srt_files(source_folder, base_filename)
-                            dest_srt_files = find_srt_files(dest_folder, base_filename)
-
-                            for srt_file in source_srt_files:
-                                dest_srt_filename = os.path.join(dest_folder, os.path.basename(srt_file))
-                                if os.path.exists(dest_srt_filename):
-                                    os.remove(dest_srt_filename)
-                                subprocess.run(
-                                    ["rsync", "-av", "--remove-source-files", srt_file, dest_folder],
-                                    check=True,
-                                )
-                                print(f"Moved SRT file for {filename}.")
-
-                        except subprocess.CalledProcessError as e:
-                            print(f"Error moving {filename} or SRT files: {e}")
-
-                    else:
-                        print(f"{filename} in {dest_folder} is already higher or equal quality/size. Skipping.")
+    for _ in range(TRANSFER_ATTEMPTS):
+        if not remaining:
+            break
+        groups = defaultdict(list)
+        for source_root, dest_root, relative in remaining:
+            groups[(source_root, dest_root)].append(relative)
+
+        remaining = []
+        for (source_root, dest_root), relative_paths in groups.items():
+            if same_device(source_root, dest_root):
+                error = _local_batch(source_root, dest_root, relative_paths)
+            else:
+                error = _rsync_batch(source_root, dest_root, relative_paths)
+            for relative in relative_paths:
+                if _transfer_succeeded(os.path.join(source_root, relative),
+                                       os.path.join(dest_root, relative), expected[relative]):
+                    results[relative] = None
                 else:
-                    try:
-                        subprocess.run(
-                            ["rsync", "-av", "--remove-source-files", source_filepath, dest_filepath],
-                            check=True,
-                        )
-                        print(f"Moved {filename} to {dest_folder}.")
-
-                        base_filename = os.path.splitext(filename)[0]
-                        source_srt_files = find_srt_files(source_folder, base_filename)
-
-                        for srt_file in source_srt_files:
-                            subprocess.run(
-                                ["rsync", "-av", "--remove-source-files", srt_file, dest_folder],
-                                check=True,
-                            )
-                            print(f"Moved SRT file for {filename}.")
-                    except subprocess.CalledProcessError as e:
-                        print(f"Error moving {filename} or SRT files: {e}")
+                    results[relative] = error or "file was not transferred"
+                    remaining.append((source_root, dest_root, relative))
+    return results
+
+def execute_actions(actions, log=print):
+    """Moves the videos decided by plan_folder in one bulk transfer, then the
+    subtitles of the videos that arrived in a second one.
+
+    Destination subtitles are only replaced once their new video is in place,
+    so a failed transfer leaves the destination folder as it was.
+    """
+    items = []
+    queued = set()
+    pending = []
+    for action in actions:
+        filename = action["filename"]
+        dest_folder = action["dest_folder"]
+
+        if action["action"] == "skip":
+            log(f"{filename} in {dest_folder} is already higher or equal quality/size. Skipping.")
+            continue
+
+        if action["action"] == "new_folder":
+            log(f"Creating new destination folder: {dest_folder}")
+
+        try:
+            os.makedirs(dest_folder, exist_ok=True)
+        except OSError as e:
+            log(f"Error creating folder or moving {filename}: {e}")
+            continue
+
+        roots = (action["source_root"], action["dest_root"])
+        video = os.path.join(action["relative_folder"], filename)
+        srts = [os.path.join(action["relative_folder"], os.path.basename(srt_file))
+                for srt_file in action["srt_files"]]
+        if video not in queued:
+            queued.add(video)
+            items.append((*roots, video))
+        pending.append((action, video, srts))
+
+    if not items:
+        return
+    try:
+        results = transfer_files(items)
+    except OSError as e:
+        log(f"Error moving files: {e}")
+        return
+
+    # Subtitles only follow videos that arrived
+    srt_items = []
+    for action, video, srts in pending:
+        if results[video]:
+            continue
+        roots = (action["source_root"], action["dest_root"])
+        try:
+            if action["action"] == "replace":
+                for dest_srt_filename in action["replaced_srt_files"]:
+                    if os.path.exists(dest_srt_filename):
+                        os.remove(dest_srt_filename)
+        except OSError as e:
+            log(f"Error removing old subtitles for {action['filename']}: {e}")
+        for srt in srts:
+            if srt not in queued:
+                queued.add(srt)
+                srt_items.append((*roots, srt))
+    if srt_items:
+        try:
+            results.update(transfer_files(srt_items))
+        except OSError as e:
+            log(f"Error moving subtitle files: {e}")
+            results.update({srt: str(e) for _, _, srt in srt_items})
+
+    for action, video, srts in pending:
+        filename = action["filename"]
+        dest_folder = action["dest_folder"]
+        if results[video]:
+            log(f"Error moving {filename}: {results[video]}")
+            continue
+        if action["action"] == "replace":
+            log(f"Replaced {filename} in {dest_folder} with higher quality/size version.")
+        elif action["action"] == "new_folder":
+            log(f"Moved {filename} to new folder {dest_folder}.")
+        else:
+            log(f"Moved {filename} to {dest_folder}.")
+        for srt in srts:
+            if results[srt]:
+                log(f"Error moving subtitle file {os.path.basename(srt)}: {results[srt]}")
             else:
-                # Destination folder doesn't exist - create it and move the file
-                print(f"Creating new destination folder: {dest_folder}")
-                try:
-                    os.makedirs(dest_folder, exist_ok=True)
-                    dest_filepath = os.path.join(dest_folder, filename)
-                    
-                    subprocess.run(
-                        ["rsync", "-av", "--remove-source-files", source_filepath, dest_filepath],
-                        check=True,
-                    )
-                    print(f"Moved {filename} to new folder {dest_folder}.")
-
-                    base_filename = os.path.splitext(filename)[0]
-                    source_srt_files = find_srt_files(source_folder, base_filename)
-
-                    for srt_file in source_srt_files:
-                        subprocess.run(
-                            ["rsync", "-av", "--remove-source-files", srt_file, dest_folder],
-                            check=True,
-                        )
-                        print(f"Moved SRT file for {filename}.")
-                except (subprocess.CalledProcessError, OSError) as e:
-                    print(f"Error creating folder or moving {filename}: {e}")
+                log(f"Moved subtitle file {os.path.basename(srt)} for {filename}.")
 
-def main():
-    source_root = input("Enter the source root folder: ")
-    destination_root = input("Enter the destination root folder: ")
+def process_folders(source_folder, destination_root, log=print):
+    """Processes video files and subtitles between source and destination, searching in subfolders."""
+    execute_actions(plan_folder(source_folder, destination_root, log=log), log=log)
 
-    for director_folder in os.listdir(source_root):
+def find_film_folders(source_root):
+    """Lists source_root/<director>/<film> folders in a stable order."""
+    film_folders = []
+    for director_folder in sorted(os.listdir(source_root)):
         director_path = os.path.join(source_root, director_folder)
 
         if os.path.isdir(director_path):
-            for film_folder in os.listdir(director_path):
+            for film_folder in sorted(os.listdir(director_path)):
                 film_path = os.path.join(director_path, film_folder)
 
                 if os.path.isdir(film_path):
-                    process_folders(film_path, destination_root)
+                    film_folders.append(film_path)
+    return film_folders
+
+def process_folders_parallel(film_folders, destination_root, workers, transfers_per_volume=1):
+    """Processes film folders concurrently.
+
+    Probing runs on up to `workers` folders at once; transfers are limited to
+    `transfers_per_volume` at a time per destination device. Each folder's
+    output is buffered and printed in folder order.
+    """
+    volume_slots = {}
+    slots_lock = threading.Lock()
+
+    def volume_slot(path):
+        device = device_of(path)
+        with slots_lock:
+            if device not in volume_slots:
+                volume_slots[device] = threading.Semaphore(transfers_per_volume)
+            return volume_slots[device]
+
+    def run(film_path):
+        lines = []
+        try:
+            actions = plan_folder(film_path, destination_root, log=lines.append)
+            if any(action["action"] != "skip" for action in actions):
+                with volume_slot(destination_root):
+                    execute_actions(actions, log=lines.append)
+            else:
+                execute_actions(actions, log=lines.append)
+        except OSError as e:
+            lines.append(f"Error processing {film_path}: {e}")
+        return lines
 
-    # Delete empty folders in source
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run, film_path) for film_path in film_folders]
+        for film_path, future in zip(film_folders, futures):
+            lines = future.result()
+            if lines:
+                print(f"--- {film_path}")
+                for line in lines:
+                    print(line)
+
+def plan_transfer_bytes(action):
+    """Bytes that an action will move (0 for skips and same-volume renames)."""
+    if action["action"] == "skip" or same_device(action["source_root"], action["dest_root"]):
+        return 0
+    total = 0
+    for path in [action["source"]] + action["srt_files"]:
+        try:
+            total += os.path.getsize(path)
+        except OSError:
+            pass
+    return total
+
+def write_plan(plan_path, source_root, destination_root, actions):
+    """Writes a machine-readable plan with byte totals and a duration estimate."""
+    counts = {}
+    for action in actions:
+        action["bytes"] = plan_transfer_bytes(action)
+        counts[action["action"]] = counts.get(action["action"], 0) + 1
+    total_bytes = sum(action["bytes"] for action in actions)
+
+    throughput = 0.0
+    if total_bytes:
+        print(f"Measuring write throughput of {destination_root}...")
+        try:
+            throughput = measure_write_throughput(destination_root)
+        except OSError as e:
+            print(f"Could not measure throughput: {e}")
+    estimated_seconds = total_bytes / throughput if throughput else None
+
+    plan = {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "source_root": source_root,
+        "destination_root": destination_root,
+        "summary": {
+            "actions": counts,
+            "bytes_to_transfer": total_bytes,
+            "throughput_bytes_per_sec": round(throughput),
+            "estimated_seconds": round(estimated_seconds) if estimated_seconds is not None else None,
+        },
+        "actions": actions,
+    }
+    with open(plan_path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, indent=2, ensure_ascii=False)
+
+    print(f"\nPlan written to {plan_path}")
+    for name, count in sorted(counts.items()):
+        print(f"  {name}: {count}")
+    print(f"  To transfer: {format_size(total_bytes)}")
+    if estimated_seconds is not None:
+        print(f"  Measured throughput: {format_size(throughput)}/s")
+        print(f"  Estimated duration: {estimated_seconds / 60:.1f} min")
+
+def load_plan(plan_path):
+    """Loads a plan written by --plan and drops actions whose source has gone."""
+    with open(plan_path, "r", encoding="utf-8") as f:
+        plan = json.load(f)
+    actions = []
+    for action in plan["actions"]:
+        if action["action"] != "skip" and not os.path.exists(action["source"]):
+            print(f"{action['filename']} no longer exists in source. Skipping.")
+            continue
+        action["srt_files"] = [path for path in action["srt_files"] if os.path.exists(path)]
+        actions.append(action)
+    return plan, actions
+
+def delete_empty_folders(source_root):
+    """Deletes film and director folders left empty in source."""
     for director_folder in os.listdir(source_root):
         director_path = os.path.join(source_root, director_folder)
         if os.path.isdir(director_path):
@@ -159,8 +400,53 @@ def main():
                     print(f"Deleted empty folder: {director_path}")
                 except Exception as e:
                     print(f"Could not delete empty folder: {director_path}. Error: {e}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Move higher quality films from a source library into the destination library.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="film folders to process concurrently (default: 1, sequential)")
+    parser.add_argument("--transfers-per-volume", type=int, default=1,
+                        help="concurrent transfers per destination volume in worker mode (default: 1)")
+    parser.add_argument("--plan", metavar="PLAN.json",
+                        help="only decide replace/skip/new-folder for each film and write the plan to this file")
+    parser.add_argument("--execute", metavar="PLAN.json",
+                        help="carry out a plan written by --plan without probing again")
+    args = parser.parse_args()
+
+    if args.execute:
+        plan, actions = load_plan(args.execute)
+        source_root = plan["source_root"]
+        print(f"Executing plan from {plan['created']}: {len(actions)} action(s)")
+        execute_actions(actions)
+        delete_empty_folders(source_root)
+        return
+
+    source_root = input("Enter the source root folder: ")
+    destination_root = input("Enter the destination root folder: ")
+
+    film_folders = find_film_folders(source_root)
+    if args.plan:
+        actions = []
+        for film_path in film_folders:
+            actions.extend(plan_folder(film_path, destination_root))
+        write_plan(args.plan, source_root, destination_root, actions)
+        save_cache()
+        return
+
+    if args.workers > 1:
+        process_folders_parallel(film_folders, destination_root, args.workers, args.transfers_per_volume)
+    else:
+        # Plan every folder first so all moves go out as one bulk transfer
+        actions = []
+        for film_path in film_folders:
+            actions.extend(plan_folder(film_path, destination_root))
+        execute_actions(actions)
+
+    delete_empty_folders(source_root)
+    save_cache()
+
 if __name__ == "__main__":
     main()
 
 # /Volumes/Films/watchedorganise/
-# /Volumes/Films/AJ/
\ No newline at end of file
+# /Volumes/Films/AJ/
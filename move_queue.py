@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Background move queue so interactive prompts never wait on NAS I/O.
+
+Moves are handed to a small thread pool. Jobs that share a key (normally the
+source and destination folders) run strictly in submission order; jobs with
+different keys run concurrently. A job is only handed to the pool once the
+jobs before it have finished, so waiting never ties up a worker.
+wait_for(folder) is the barrier before touching one folder (e.g. cleaning it
+up); wait() is the barrier before anything that depends on every move being
+finished (e.g. the empty-folder sweep).
+"""
+
+import os
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait as wait_futures
+from typing import Callable, Iterable, List, Tuple, Union
+
+DEFAULT_WORKERS = 2
+
+
+class MoveQueue:
+    def __init__(self, workers: int = DEFAULT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='move')
+        self._lock = threading.Lock()
+        self._tails = {}      # key -> last future submitted for that key
+        self._pending = {}    # future -> description
+        self._failures = []   # (description, exception)
+        self._done = 0
+
+    def submit(self, keys: Union[str, Iterable[str]], description: str, func: Callable, *args, **kwargs):
+        """Queue func(*args, **kwargs) after every earlier job sharing one of its keys."""
+        keys = (keys,) if isinstance(keys, str) else tuple(keys)
+        future = Future()
+        with self._lock:
+            previous = {self._tails[key] for key in keys if key in self._tails}
+            for key in keys:
+                self._tails[key] = future
+            self._pending[future] = description
+        future.add_done_callback(self._finished)
+
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = func(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        # Started by whichever earlier job finishes last, in that job's callback
+        remaining = [len(previous)]
+        countdown = threading.Lock()
+
+        def release(_):
+            with countdown:
+                remaining[0] -= 1
+                ready = remaining[0] == 0
+            if ready:
+                self._executor.submit(run)
+
+        if not previous:
+            self._executor.submit(run)
+        for earlier in previous:
+            earlier.add_done_callback(release)
+        return future
+
+    def _finished(self, future):
+        with self._lock:
+            description = self._pending.pop(future, '?')
+            for key in [key for key, tail in self._tails.items() if tail is future]:
+                del self._tails[key]
+            self._done += 1
+            error = future.exception()
+            if error is not None:
+                self._failures.append((description, error))
+        if error is not None:
+            print(f"\n  ✗ Background move failed: {description}: {error}")
+        else:
+            print(f"\n  ✓ Background move done: {description}")
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def status(self) -> str:
+        """One-line summary of queued/running moves, empty when idle."""
+        with self._lock:
+            pending = list(self._pending.values())
+            done, failed = self._done, len(self._failures)
+        if not pending:
+            return ""
+        return f"⏳ {len(pending)} move(s) pending ({done} done, {failed} failed) - next: {pending[0]}"
+
+    def wait_for(self, folder: str):
+        """Block until every job keyed on folder, or on a path inside it, finished."""
+        folder = os.path.abspath(folder)
+        with self._lock:
+            futures = [tail for key, tail in self._tails.items()
+                       if os.path.commonpath([folder, os.path.abspath(key)]) == folder]
+        if futures:
+            print(f"  Waiting for {len(futures)} background move(s) in {os.path.basename(folder)}...")
+            wait_futures(futures)
+
+    def wait(self) -> List[Tuple[str, BaseException]]:
+        """Block until every queued move finished. Returns the failures."""
+        while True:
+            with self._lock:
+                futures = list(self._pending)
+            if not futures:
+                break
+            sys.stdout.write(f"\r  Waiting for {len(futures)} background move(s)...   ")
+            sys.stdout.flush()
+            wait_futures(futures, timeout=1.0)
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            return list(self._failures)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Normalization-insensitive lookup of names on disk.
+
+Names typed by the user or taken from IMDb are usually NFC, while folders
+on the NAS may be NFD (or the other way round), so a plain os.path.join +
+os.path.exists misses them. Each directory is listed once and its names are
+indexed by normalized form (and, as a fallback, case-insensitively), so a
+lookup is a dict access.
+
+- resolve_name(directory, name): actual on-disk name, or None
+- resolve_path(base, *parts): base joined with the on-disk spelling of each
+  part, or None if any part is missing
+- same_path(a, b): True if two paths name the same entry regardless of
+  Unicode normalization
+
+Listings are cached per directory (get_names). A miss re-lists the
+directory if the listing is more than a few seconds old, so entries created
+since it was cached are still found; forget() drops a cached listing after
+entries are removed or renamed.
+"""
+
+import os
+import threading
+import time
+import unicodedata
+from typing import Dict, Optional
+
+from copy_engine import name_key
+
+MISS_REFRESH_AGE = 5  # seconds; a miss re-lists a directory cached longer than this
+
+
+def _normalized(name: str) -> str:
+    return name if name.isascii() else unicodedata.normalize('NFC', name)
+
+
+class DirectoryNames:
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        names = set()
+        by_normalized = {}
+        by_key = {}
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    names.add(entry.name)
+                    by_normalized.setdefault(_normalized(entry.name), entry.name)
+                    # None marks a key shared by several names: too ambiguous to pick one
+                    key = name_key(entry.name)
+                    by_key[key] = None if key in by_key else entry.name
+        except OSError:
+            pass
+        with self._lock:
+            self._loaded_at = time.monotonic()
+            self._names = names
+            self._by_normalized = by_normalized
+            self._by_key = by_key
+
+    def _lookup(self, name: str) -> Optional[str]:
+        with self._lock:
+            if name in self._names:
+                return name
+            match = self._by_normalized.get(_normalized(name))
+            if match is None:
+                match = self._by_key.get(name_key(name))
+            return match
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Actual name of the entry matching name, or None."""
+        match = self._lookup(name)
+        if match is None and time.monotonic() - self._loaded_at > MISS_REFRESH_AGE:
+            self._load()  # it may have been created since the listing was cached
+            match = self._lookup(name)
+        return match
+
+
+_directories: Dict[str, DirectoryNames] = {}
+_directories_lock = threading.Lock()
+
+
+def get_names(directory: str) -> DirectoryNames:
+    """Shared, cached name index for directory."""
+    key = os.path.normpath(directory)
+    with _directories_lock:
+        names = _directories.get(key)
+    if names is None:
+        names = DirectoryNames(directory)
+        with _directories_lock:
+            names = _directories.setdefault(key, names)
+    return names
+
+
+def forget(directory: str):
+    with _directories_lock:
+        _directories.pop(os.path.normpath(directory), None)
+
+
+def resolve_name(directory: str, name: str) -> Optional[str]:
+    return get_names(directory).resolve(name)
+
+
+def resolve_path(base: str, *parts: str) -> Optional[str]:
+    """base/part1/part2/... with each part spelled as it is on disk, or None."""
+    path = base
+    for part in parts:
+        actual = resolve_name(path, part)
+        if actual is None:
+            return None
+        path = os.path.join(path, actual)
+    return path
+
+
+def same_path(a: str, b: str) -> bool:
+    """Compare two paths ignoring Unicode normalization differences."""
+    return _normalized(os.path.normpath(a)) == _normalized(os.path.normpath(b))
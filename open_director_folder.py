@@ -2,12 +2,15 @@
 """
 Script to open director folders and their movies in Finder.
 Works around SMB permission display issues by opening subfolders directly.
+The director name is matched regardless of Unicode normalization (NFC/NFD).
 """
 
 import os
 import sys
 import subprocess
 
+from name_resolver import resolve_path
+
 def list_director_contents(director_path):
     """List all movies in a director folder."""
     if not os.path.exists(director_path):
@@ -40,9 +43,9 @@ def main():
     
     director_name = sys.argv[1]
     base_path = '/Volumes/Films/AJ/'
-    director_path = os.path.join(base_path, director_name)
+    director_path = resolve_path(base_path, director_name)
     
-    if not os.path.exists(director_path):
+    if director_path is None:
         print(f"Director folder not found: {director_name}")
         sys.exit(1)
     
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Per-directory index of video files and their sidecar subtitles.
+
+A directory is listed once; every subtitle (all SUBTITLE_EXTENSIONS,
+language-suffixed names like "Film.en.srt", ".idx/.sub" pairs) is assigned to
+the video it belongs to:
+- exact stem match, after stripping language/flag suffixes
+  ("Film.en.forced.srt" -> "Film"), case-insensitive
+- otherwise the longest video stem the subtitle name starts with, if only
+  language/flag tags follow it ("Film_eng.srt", "Film - English.srt")
+Other dotted components are part of the title: "Alien.Resurrection.srt"
+does not belong to "Alien.mkv".
+
+Indexes are cached per directory (get_index) and updated in place with
+add()/discard() as files move, so callers never re-list a folder.
+"""
+
+import os
+import re
+import threading
+from typing import Dict, List, Optional
+
+VIDEO_EXTENSIONS = {'.mp4', '.mkv', '.avi', '.mov', '.wmv', '.flv', '.webm', '.m4v', '.mpg', '.mpeg', '.m2ts', '.ts', '.vob', '.ogv', '.3gp'}
+SUBTITLE_EXTENSIONS = {'.srt', '.sub', '.ass', '.ssa', '.vtt', '.idx'}
+
+# Language codes/names and flags that may follow the video stem in a subtitle name
+SUBTITLE_TAGS = {
+    # ISO 639-1
+    'en', 'fr', 'de', 'es', 'it', 'pt', 'nl', 'sv', 'no', 'nb', 'nn', 'da', 'fi', 'pl', 'ru', 'ja',
+    'zh', 'ko', 'ar', 'he', 'tr', 'el', 'cs', 'hu', 'ro', 'bg', 'hr', 'sr', 'sl', 'sk', 'uk', 'th',
+    'vi', 'id', 'ms', 'hi', 'fa', 'et', 'lv', 'lt', 'is', 'ga', 'ca', 'eu', 'gl',
+    # ISO 639-2 (bibliographic and terminology forms)
+    'eng', 'fre', 'fra', 'ger', 'deu', 'spa', 'ita', 'por', 'dut', 'nld', 'swe', 'nor', 'dan', 'fin',
+    'pol', 'rus', 'jpn', 'chi', 'zho', 'kor', 'ara', 'heb', 'tur', 'gre', 'ell', 'cze', 'ces', 'hun',
+    'rum', 'ron', 'bul', 'hrv', 'srp', 'slv', 'slo', 'slk', 'ukr', 'tha', 'vie', 'ind', 'may', 'msa',
+    'hin', 'per', 'fas', 'est', 'lav', 'lit', 'ice', 'isl', 'gle', 'cat', 'baq', 'eus', 'glg',
+    # Names
+    'english', 'french', 'german', 'spanish', 'italian', 'portuguese', 'dutch', 'swedish',
+    'norwegian', 'danish', 'finnish', 'polish', 'russian', 'japanese', 'chinese', 'korean',
+    'arabic', 'hebrew', 'turkish', 'greek', 'czech', 'hungarian', 'romanian',
+    # Regions and scripts ("pt-BR", "zh-Hans")
+    'br', 'us', 'gb', 'latam', 'hans', 'hant',
+    # Flags
+    'forced', 'sdh', 'cc', 'default', 'full', 'signs',
+}
+_TAG_SEPARATORS = re.compile(r'[._\- ]+')
+
+
+def _extension(name: str) -> str:
+    return os.path.splitext(name)[1].lower()
+
+
+def _is_tag(token: str) -> bool:
+    return token in SUBTITLE_TAGS or token.isdigit()
+
+
+def _only_tags(rest: str) -> bool:
+    """True if rest (what follows a video stem) is a separator plus language/flag tags."""
+    if not rest or not _TAG_SEPARATORS.match(rest):
+        return False
+    return all(_is_tag(token) for token in _TAG_SEPARATORS.split(rest) if token)
+
+
+def sidecar_suffix(sidecar_name: str, video_name: str) -> str:
+    """Part of the sidecar name after the video stem, e.g. '.en.srt'."""
+    stem = os.path.splitext(video_name)[0]
+    return sidecar_name[len(stem):]
+
+
+class SidecarIndex:
+    def __init__(self, directory: str, names: Optional[List[str]] = None):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._videos = {}     # lowercase stem -> video name
+        self._sidecars = {}   # sidecar name -> lowercase stem of its video (or None)
+        self._names = set()
+        if names is None:
+            try:
+                with os.scandir(directory) as it:
+                    names = [entry.name for entry in it if entry.is_file()]
+            except OSError:
+                names = []
+        for name in names:
+            if _extension(name) in VIDEO_EXTENSIONS:
+                self._videos[os.path.splitext(name)[0].lower()] = name
+            self._names.add(name)
+        for name in names:
+            if _extension(name) in SUBTITLE_EXTENSIONS:
+                self._sidecars[name] = self._owner(name)
+
+    def _owner(self, sidecar_name: str) -> Optional[str]:
+        stem = os.path.splitext(sidecar_name)[0].lower()
+        candidate = stem
+        while True:
+            if candidate in self._videos:
+                return candidate
+            head, dot, tag = candidate.rpartition('.')
+            if not dot or not _is_tag(tag):
+                break
+            candidate = head
+        prefixes = [video_stem for video_stem in self._videos
+                    if stem.startswith(video_stem) and _only_tags(stem[len(video_stem):])]
+        return max(prefixes, key=len) if prefixes else None
+
+    def __contains__(self, name: str) -> bool:
+        with self._lock:
+            return name in self._names
+
+    def videos(self) -> List[str]:
+        with self._lock:
+            return sorted(self._videos.values())
+
+    def sidecar_names(self, video_name: str) -> List[str]:
+        key = os.path.splitext(video_name)[0].lower()
+        with self._lock:
+            return sorted(name for name, owner in self._sidecars.items() if owner == key)
+
+    def sidecars(self, video_name: str) -> List[str]:
+        """Full paths of every sidecar belonging to video_name."""
+        return [os.path.join(self.directory, name) for name in self.sidecar_names(video_name)]
+
+    def owned_sidecars(self) -> List[str]:
+        """Full paths of all sidecars that belong to some video in this directory."""
+        with self._lock:
+            return sorted(os.path.join(self.directory, name)
+                          for name, owner in self._sidecars.items() if owner is not None)
+
+    def add(self, name: str):
+        """Record a file that was moved or renamed into this directory."""
+        with self._lock:
+            self._names.add(name)
+            ext = _extension(name)
+            if ext in VIDEO_EXTENSIONS:
+                self._videos[os.path.splitext(name)[0].lower()] = name
+                # A new video can claim sidecars that matched nothing or a shorter prefix
+                for sidecar in self._sidecars:
+                    self._sidecars[sidecar] = self._owner(sidecar)
+            if ext in SUBTITLE_EXTENSIONS:
+                self._sidecars[name] = self._owner(name)
+
+    def discard(self, name: str):
+        """Forget a file that was moved out of (or deleted from) this directory."""
+        with self._lock:
+            self._names.discard(name)
+            self._sidecars.pop(name, None)
+            key = os.path.splitext(name)[0].lower()
+            if self._videos.get(key) == name:
+                del self._videos[key]
+                for sidecar, owner in self._sidecars.items():
+                    if owner == key:
+                        self._sidecars[sidecar] = self._owner(sidecar)
+
+
+_indexes: Dict[str, SidecarIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(directory: str) -> SidecarIndex:
+    """Shared index for directory, built on first use."""
+    key = os.path.normpath(directory)
+    with _indexes_lock:
+        index = _indexes.get(key)
+    if index is None:
+        index = SidecarIndex(directory)
+        with _indexes_lock:
+            index = _indexes.setdefault(key, index)
+    return index
+
+
+def forget_index(directory: str):
+    with _indexes_lock:
+        _indexes.pop(os.path.normpath(directory), None)
@@ -0,0 +1,128 @@
+"""read_container_info on minimal synthetic MKV, MP4 and AVI headers."""
+
+import struct
+
+import pytest
+
+from container_info import read_container_info
+
+
+# --- builders ---------------------------------------------------------------
+
+def ebml(element_id, payload):
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, 'big')
+    return id_bytes + b'\x01' + len(payload).to_bytes(7, 'big') + payload
+
+
+def ebml_uint(element_id, value):
+    return ebml(element_id, value.to_bytes(4, 'big'))
+
+
+def make_mkv(width=1920, height=800, duration_ms=5400000.0, codec=b'V_MPEGH/ISO/HEVC'):
+    info = ebml(0x1549A966, ebml_uint(0x2AD7B1, 1000000) + ebml(0x4489, struct.pack('>d', duration_ms)))
+    audio = ebml(0xAE, ebml_uint(0x83, 2) + ebml(0x86, b'A_AAC'))
+    video = ebml(0xAE, ebml_uint(0x83, 1) + ebml(0x86, codec)
+                 + ebml(0xE0, ebml_uint(0xB0, width) + ebml_uint(0xBA, height)))
+    tracks = ebml(0x1654AE6B, audio + video)
+    cluster = ebml(0x1F43B675, b'\0' * 64)
+    return ebml(0x1A45DFA3, ebml(0x4282, b'matroska')) + ebml(0x18538067, info + tracks + cluster)
+
+
+def box(box_type, payload):
+    return struct.pack('>I4s', 8 + len(payload), box_type) + payload
+
+
+def make_mp4(width=1280, height=720, timescale=1000, duration=90500, codec=b'avc1', display=None):
+    display_width, display_height = display or (width, height)
+    mvhd = box(b'mvhd', b'\0' * 12 + struct.pack('>II', timescale, duration) + b'\0' * 80)
+    tkhd = box(b'tkhd', b'\0' * 76 + struct.pack('>II', display_width << 16, display_height << 16))
+    hdlr = box(b'hdlr', b'\0' * 8 + b'vide' + b'\0' * 13)
+    sample_entry = struct.pack('>I4s', 86, codec) + b'\0' * 24 + struct.pack('>HH', width, height) + b'\0' * 50
+    stsd = box(b'stsd', struct.pack('>II', 0, 1) + sample_entry)
+    minf = box(b'minf', box(b'stbl', stsd))
+    trak = box(b'trak', tkhd + box(b'mdia', hdlr + minf))
+    return box(b'ftyp', b'isom\0\0\0\0') + box(b'moov', mvhd + trak) + box(b'mdat', b'\0' * 64)
+
+
+def chunk(chunk_id, payload):
+    return struct.pack('<4sI', chunk_id, len(payload)) + payload + b'\0' * (len(payload) & 1)
+
+
+def riff_list(list_type, payload):
+    return chunk(b'LIST', list_type + payload)
+
+
+def make_avi(width=720, height=576, usec_per_frame=40000, frames=2500, fourcc=b'XVID', odml_frames=None):
+    avih = chunk(b'avih', struct.pack('<IIII', usec_per_frame, 0, 0, 0)
+                 + struct.pack('<IIII', frames, 0, 1, 0) + struct.pack('<II', width, height) + b'\0' * 16)
+    strh = chunk(b'strh', b'vids' + fourcc.lower() + b'\0' * 48)
+    strf = chunk(b'strf', struct.pack('<IiiHH4s', 40, width, -height, 1, 24, fourcc) + b'\0' * 20)
+    odml = b''
+    if odml_frames is not None:
+        odml = riff_list(b'odml', chunk(b'dmlh', struct.pack('<I', odml_frames) + b'\0' * 244))
+    hdrl = riff_list(b'hdrl', avih + riff_list(b'strl', strh + strf) + odml)
+    body = b'AVI ' + hdrl + riff_list(b'movi', b'\0' * 64)
+    return b'RIFF' + struct.pack('<I', len(body)) + body
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+# --- tests ------------------------------------------------------------------
+
+def test_mkv(tmp_path):
+    info = read_container_info(write(tmp_path, 'film.mkv', make_mkv()))
+    assert info == {'resolution': 800, 'width': 1920, 'height': 800, 'duration': 5400.0, 'codec': 'HEVC'}
+
+
+def test_mp4(tmp_path):
+    info = read_container_info(write(tmp_path, 'film.mp4', make_mp4()))
+    assert info == {'resolution': 720, 'width': 1280, 'height': 720, 'duration': 90.5, 'codec': 'AVC'}
+
+
+def test_avi(tmp_path):
+    info = read_container_info(write(tmp_path, 'film.avi', make_avi()))
+    assert info == {'resolution': 576, 'width': 720, 'height': 576, 'duration': 100.0,
+                    'codec': 'MPEG-4 Visual'}
+
+
+def test_anamorphic_mp4_reports_coded_size(tmp_path):
+    """The stsd sample entry (what mediainfo reports), not the tkhd display size."""
+    info = read_container_info(write(tmp_path, 'film.mp4', make_mp4(720, 576, display=(1024, 576))))
+    assert (info['width'], info['height']) == (720, 576)
+
+
+def test_opendml_avi_duration_counts_all_riff_chunks(tmp_path):
+    info = read_container_info(write(tmp_path, 'film.avi', make_avi(frames=2500, odml_frames=162000)))
+    assert info['duration'] == 6480.0
+
+
+def test_extension_is_case_insensitive(tmp_path):
+    assert read_container_info(write(tmp_path, 'FILM.MKV', make_mkv()))['height'] == 800
+
+
+@pytest.mark.parametrize('name, data', [
+    ('film.mkv', make_mkv()[:60]),
+    ('film.mp4', make_mp4()[:120]),
+    ('film.avi', make_avi()[:40]),
+])
+def test_truncated_headers_return_none(tmp_path, name, data):
+    assert read_container_info(write(tmp_path, name, data)) is None
+
+
+@pytest.mark.parametrize('name, data', [
+    ('film.mkv', b''),
+    ('film.mkv', b'not a matroska file at all'),
+    ('film.mp4', box(b'ftyp', b'isom') + box(b'mdat', b'\0' * 16)),
+    ('film.avi', make_mp4()),
+    ('film.wmv', make_mkv()),
+])
+def test_unsupported_input_returns_none(tmp_path, name, data):
+    assert read_container_info(write(tmp_path, name, data)) is None
+
+
+def test_missing_file_returns_none(tmp_path):
+    assert read_container_info(str(tmp_path / 'missing.mkv')) is None
@@ -0,0 +1,124 @@
+"""copy_engine moves between two local filesystems (/tmp and /dev/shm)."""
+
+import errno
+import os
+import shutil
+import tempfile
+
+import pytest
+
+import copy_engine
+from copy_engine import move_file, move_tree, new_stats
+
+OTHER_FS = '/dev/shm'
+
+
+@pytest.fixture
+def other_fs_dir(tmp_path):
+    if not os.path.isdir(OTHER_FS) or os.stat(OTHER_FS).st_dev == os.stat(tmp_path).st_dev:
+        pytest.skip(f"{OTHER_FS} is not a separate filesystem from {tmp_path}")
+    path = tempfile.mkdtemp(dir=OTHER_FS)
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def make_file(path, size, mode=0o640, mtime=1_500_000_000):
+    with open(path, 'wb') as f:
+        f.write(os.urandom(size))
+    os.chmod(path, mode)
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_move_file_across_filesystems(tmp_path, other_fs_dir):
+    # Larger than one copy buffer, so the offload/read loop runs more than once
+    size = copy_engine.COPY_BUFFER_SIZE + 12345
+    src = make_file(str(tmp_path / 'film.mkv'), size)
+    content = read(src)
+    dst = os.path.join(other_fs_dir, 'film.mkv')
+    stats = new_stats()
+
+    assert not copy_engine.same_device(src, dst)
+    assert move_file(src, dst, stats=stats) == 'copied'
+
+    assert not os.path.exists(src)
+    assert read(dst) == content
+    st = os.stat(dst)
+    assert st.st_mode & 0o777 == 0o640
+    assert st.st_mtime == pytest.approx(1_500_000_000, abs=1)
+    assert stats['files'] == 1
+    assert stats['bytes'] == size
+    assert stats['renamed'] == 0
+    assert stats['seconds'] > 0
+    assert not [name for name in os.listdir(other_fs_dir) if name.endswith('.partial')]
+
+
+def test_move_file_into_directory(tmp_path, other_fs_dir):
+    src = make_file(str(tmp_path / 'film.srt'), 100)
+    assert move_file(src, other_fs_dir) == 'copied'
+    assert os.path.getsize(os.path.join(other_fs_dir, 'film.srt')) == 100
+
+
+def test_move_tree_across_filesystems(tmp_path, other_fs_dir):
+    src = tmp_path / 'Director' / '2001 - Film'
+    src.mkdir(parents=True)
+    make_file(str(src / 'Film.mkv'), 5000)
+    make_file(str(src / 'Film.en.srt'), 300, mode=0o600)
+    dst = os.path.join(other_fs_dir, '2001 - Film')
+    stats = new_stats()
+
+    assert move_tree(str(src), dst, stats=stats) == 'copied'
+
+    assert not src.exists()
+    assert sorted(os.listdir(dst)) == ['Film.en.srt', 'Film.mkv']
+    assert os.stat(os.path.join(dst, 'Film.en.srt')).st_mode & 0o777 == 0o600
+    assert stats['files'] == 2
+    assert stats['bytes'] == 5300
+
+
+def test_rename_exdev_falls_back_to_copy(tmp_path, monkeypatch):
+    """A rename refused with EXDEV (e.g. across a bind mount) is retried as a copy."""
+    src = make_file(str(tmp_path / 'film.mkv'), 4096)
+    dst = str(tmp_path / 'moved.mkv')
+
+    def refuse(*args):
+        raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+
+    monkeypatch.setattr(copy_engine.os, 'rename', refuse)
+    stats = new_stats()
+    assert move_file(src, dst, stats=stats) == 'copied'
+    assert not os.path.exists(src)
+    assert os.path.getsize(dst) == 4096
+    assert stats['files'] == 1 and stats['bytes'] == 4096
+
+
+def test_same_filesystem_is_a_rename(tmp_path):
+    src = make_file(str(tmp_path / 'film.mkv'), 10)
+    stats = new_stats()
+    assert move_file(src, str(tmp_path / 'renamed.mkv'), stats=stats) == 'renamed'
+    assert stats['renamed'] == 1 and stats['bytes'] == 0
+
+
+def test_offload_switch_midway_keeps_offsets(tmp_path, monkeypatch):
+    """copy_file_range giving up partway must not make sendfile overwrite the head."""
+    if not (hasattr(os, 'copy_file_range') and hasattr(os, 'sendfile')):
+        pytest.skip("needs os.copy_file_range and os.sendfile")
+    size = 3 * 4096 + 17
+    src = make_file(str(tmp_path / 'film.mkv'), size)
+    calls = []
+
+    def partial_copy_range(fd_in, fd_out, offset, count):
+        if calls:
+            raise OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+        calls.append(offset)
+        return os.copy_file_range(fd_in, fd_out, min(count, 4096), offset, offset)
+
+    monkeypatch.setattr(copy_engine, '_copy_range', partial_copy_range)
+    dst = str(tmp_path / 'copy.mkv')
+    assert copy_engine.copy_file(src, dst, buffer_size=4096) == size
+    assert read(dst) == read(src)
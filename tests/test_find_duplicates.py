@@ -0,0 +1,44 @@
+"""find_duplicates: overlapping roots and hard links are not duplicates."""
+
+import os
+
+from find_duplicates import canonical_roots, find_identical, scan_videos
+
+
+def make_video(path, data=b'\1' * 4096):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return str(path)
+
+
+def test_canonical_roots_drops_nested_and_aliased_roots(tmp_path):
+    library = tmp_path / 'Films'
+    (library / 'AJ').mkdir(parents=True)
+    (tmp_path / 'FilmsLibrary').mkdir()
+    os.symlink(library, tmp_path / 'alias')
+    roots = [str(library / 'AJ'), str(tmp_path / 'alias'), f"{library}/", str(tmp_path / 'FilmsLibrary')]
+    assert canonical_roots(roots) == [os.path.realpath(library), os.path.realpath(tmp_path / 'FilmsLibrary')]
+
+
+def test_overlapping_roots_list_each_file_once(tmp_path):
+    film = make_video(tmp_path / 'AJ' / 'Director' / '2001 - Film' / 'Film.mkv')
+    videos = scan_videos([str(tmp_path / 'AJ'), str(tmp_path / 'AJ' / 'Director')], 0)
+    assert videos == [(os.path.realpath(film), 4096)]
+    assert find_identical(videos, workers=2) == []
+
+
+def test_hard_links_are_not_duplicates(tmp_path):
+    film = make_video(tmp_path / 'AJ' / '2001 - Film' / 'Film.mkv')
+    os.makedirs(tmp_path / 'Backup' / '2001 - Film')
+    os.link(film, tmp_path / 'Backup' / '2001 - Film' / 'Film.mkv')
+    videos = scan_videos([str(tmp_path / 'AJ'), str(tmp_path / 'Backup')], 0)
+    assert len(videos) == 1
+    assert find_identical(videos, workers=2) == []
+
+
+def test_real_copies_are_identical(tmp_path):
+    first = make_video(tmp_path / 'AJ' / '2001 - Film' / 'Film.mkv')
+    second = make_video(tmp_path / 'Backup' / '2001 - Film' / 'Film.mkv')
+    videos = scan_videos([str(tmp_path / 'AJ'), str(tmp_path / 'Backup')], 0)
+    assert find_identical(videos, workers=2) == [sorted([os.path.realpath(first), os.path.realpath(second)])]
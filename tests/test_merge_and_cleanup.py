@@ -0,0 +1,141 @@
+"""Merge verification in merge_and_cleanup, including symlinks."""
+
+import os
+import pathlib
+import shutil
+import tempfile
+
+import pytest
+
+import merge_and_cleanup
+
+
+def make_source(root):
+    film = root / 'Director' / '2001 - Film'
+    film.mkdir(parents=True)
+    (film / 'Film.mkv').write_bytes(b'\0' * 5000)
+    (film / 'Film.en.srt').write_text('1\n00:00:01,000 --> 00:00:02,000\nHi\n')
+    os.symlink('Film.mkv', film / 'Film (link).mkv')
+    os.symlink('/nonexistent/poster.jpg', film / 'poster.jpg')
+    return root
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    source = make_source(tmp_path / 'source')
+    destination = tmp_path / 'destination'
+    destination.mkdir()
+    monkeypatch.setattr(merge_and_cleanup, 'SOURCE', f"{source}/")
+    monkeypatch.setattr(merge_and_cleanup, 'DESTINATION', f"{destination}/")
+    return source, destination
+
+
+def rsync_a(source, destination):
+    """What rsync -a SOURCE/ DESTINATION does for these trees: links are copied as links."""
+    shutil.copytree(source, destination, symlinks=True, dirs_exist_ok=True)
+
+
+def test_manifest_records_symlinks_themselves(paths):
+    source, _ = paths
+    manifest = {relative: size for relative, size, _ in merge_and_cleanup.build_manifest(str(source))}
+    assert manifest[os.path.join('Director', '2001 - Film', 'Film (link).mkv')] == len('Film.mkv')
+    assert os.path.join('Director', '2001 - Film', 'poster.jpg') in manifest
+
+
+def test_verify_merge_accepts_symlinks(paths):
+    source, destination = paths
+    manifest = merge_and_cleanup.build_manifest(str(source))
+    rsync_a(source, destination)
+    assert merge_and_cleanup.verify_merge(manifest)
+    assert merge_and_cleanup.verify_checksums(manifest)
+
+
+def test_verify_merge_detects_a_followed_symlink(paths):
+    source, destination = paths
+    manifest = merge_and_cleanup.build_manifest(str(source))
+    rsync_a(source, destination)
+    link = destination / 'Director' / '2001 - Film' / 'Film (link).mkv'
+    link.unlink()
+    shutil.copy2(source / 'Director' / '2001 - Film' / 'Film.mkv', link)
+    assert not merge_and_cleanup.verify_merge(manifest)
+
+
+def test_verify_checksums_detects_a_retargeted_symlink(paths):
+    source, destination = paths
+    manifest = merge_and_cleanup.build_manifest(str(source))
+    rsync_a(source, destination)
+    link = destination / 'Director' / '2001 - Film' / 'Film (link).mkv'
+    link.unlink()
+    os.symlink('Film.avi', link)
+    assert not merge_and_cleanup.verify_checksums(manifest)
+
+
+def test_verify_merge_reports_missing_files(paths):
+    source, destination = paths
+    manifest = merge_and_cleanup.build_manifest(str(source))
+    rsync_a(source, destination)
+    (destination / 'Director' / '2001 - Film' / 'Film.en.srt').unlink()
+    assert not merge_and_cleanup.verify_merge(manifest)
+
+
+
+OTHER_FS = '/dev/shm'
+DIRECTORY_MTIME = 1_400_000_000
+
+
+def other_fs_dir(tmp_path, request):
+    if not os.path.isdir(OTHER_FS) or os.stat(OTHER_FS).st_dev == os.stat(tmp_path).st_dev:
+        pytest.skip(f"{OTHER_FS} is not a separate filesystem from {tmp_path}")
+    path = pathlib.Path(tempfile.mkdtemp(dir=OTHER_FS))
+    request.addfinalizer(lambda: shutil.rmtree(path, ignore_errors=True))
+    return path
+
+
+@pytest.fixture(params=['same-device', 'cross-device'])
+def native_paths(request, tmp_path, monkeypatch):
+    source = make_source(tmp_path / 'source')
+    for directory, _, _ in os.walk(source):
+        os.utime(directory, (DIRECTORY_MTIME, DIRECTORY_MTIME))
+    if request.param == 'same-device':
+        destination = tmp_path / 'destination'
+        destination.mkdir()
+    else:
+        destination = other_fs_dir(tmp_path, request)
+    monkeypatch.setattr(merge_and_cleanup, 'SOURCE', f"{source}/")
+    monkeypatch.setattr(merge_and_cleanup, 'DESTINATION', f"{destination}/")
+    return source, destination
+
+
+def test_native_merge_keeps_symlinks_and_directory_times(native_paths):
+    source, destination = native_paths
+    manifest = merge_and_cleanup.build_manifest(str(source))
+
+    assert merge_and_cleanup.native_merge(streams=2)
+
+    film = destination / 'Director' / '2001 - Film'
+    assert os.readlink(film / 'Film (link).mkv') == 'Film.mkv'
+    assert os.readlink(film / 'poster.jpg') == '/nonexistent/poster.jpg'
+    for directory in (film, film.parent, destination):
+        assert os.stat(directory).st_mtime == pytest.approx(DIRECTORY_MTIME, abs=1)
+    assert merge_and_cleanup.verify_merge(manifest)
+
+
+def test_native_merge_skips_identical_files_and_symlinks(tmp_path, request, monkeypatch):
+    source = make_source(tmp_path / 'source')
+    destination = other_fs_dir(tmp_path, request)
+    monkeypatch.setattr(merge_and_cleanup, 'SOURCE', f"{source}/")
+    monkeypatch.setattr(merge_and_cleanup, 'DESTINATION', f"{destination}/")
+    assert merge_and_cleanup.native_merge(streams=2)
+
+    metrics = merge_and_cleanup.new_metrics('native')
+    assert merge_and_cleanup.native_merge(streams=2, metrics=metrics)
+    assert metrics['files_transferred'] == 0
+
+
+def test_native_merge_fails_on_special_files(tmp_path, request, monkeypatch):
+    source = make_source(tmp_path / 'source')
+    os.mkfifo(source / 'pipe')
+    destination = other_fs_dir(tmp_path, request)
+    monkeypatch.setattr(merge_and_cleanup, 'SOURCE', f"{source}/")
+    monkeypatch.setattr(merge_and_cleanup, 'DESTINATION', f"{destination}/")
+    assert not merge_and_cleanup.native_merge(streams=2)
@@ -0,0 +1,22 @@
+"""move_qualitycheck.transfer_files with a file that vanished before the move."""
+
+import os
+
+from move_qualitycheck import transfer_files
+
+
+def test_missing_file_fails_alone(tmp_path):
+    source, destination = tmp_path / 'source', tmp_path / 'destination'
+    (source / '2001 - Film').mkdir(parents=True)
+    (source / '2001 - Film' / 'Film.mkv').write_bytes(b'\0' * 2048)
+    (source / '2001 - Film' / 'Film.en.srt').write_text('1\n')
+    items = [(str(source), str(destination), os.path.join('2001 - Film', name))
+             for name in ('Film.mkv', 'Gone.mkv', 'Film.en.srt')]
+
+    results = transfer_files(items)
+
+    assert results[os.path.join('2001 - Film', 'Gone.mkv')]
+    assert results[os.path.join('2001 - Film', 'Film.mkv')] is None
+    assert results[os.path.join('2001 - Film', 'Film.en.srt')] is None
+    assert (destination / '2001 - Film' / 'Film.mkv').stat().st_size == 2048
+    assert not (source / '2001 - Film' / 'Film.mkv').exists()
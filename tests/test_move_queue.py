@@ -0,0 +1,51 @@
+"""MoveQueue ordering and per-folder barriers."""
+
+import threading
+
+from move_queue import MoveQueue
+
+
+def test_jobs_with_a_shared_key_run_in_order():
+    queue = MoveQueue(workers=4)
+    order = []
+    for index in range(20):
+        queue.submit(('/films/Director/2001 - Film', f"/incoming/{index % 3}"), str(index), order.append, index)
+    assert queue.wait() == []
+    assert order == list(range(20))
+
+
+def test_waiting_job_does_not_hold_a_worker():
+    queue = MoveQueue(workers=2)
+    release = threading.Event()
+    queue.submit('/films/A', 'first', release.wait, 5)
+    queue.submit('/films/A', 'second', lambda: None)
+    other = queue.submit('/films/B', 'other', lambda: 'done')
+    # With 'second' parked on a worker, 'other' would wait for 'first'
+    assert other.result(timeout=2) == 'done'
+    release.set()
+    assert queue.wait() == []
+
+
+def test_wait_for_covers_nested_folders_only():
+    queue = MoveQueue(workers=2)
+    release = threading.Event()
+    inside = queue.submit(('/films/Director/2001 - Film', '/incoming/Film'), 'inside', lambda: None)
+    outside = queue.submit('/elsewhere', 'outside', release.wait, 5)
+    queue.wait_for('/films')
+    assert inside.done()
+    assert not outside.done()
+    release.set()
+    assert queue.wait() == []
+
+
+def test_failures_are_reported_and_do_not_block_the_chain():
+    queue = MoveQueue(workers=1)
+
+    def fail():
+        raise OSError("disk gone")
+
+    queue.submit('/films/A', 'broken', fail)
+    after = queue.submit('/films/A', 'after', lambda: 'ran')
+    failures = queue.wait()
+    assert after.result() == 'ran'
+    assert [(description, str(error)) for description, error in failures] == [('broken', 'disk gone')]
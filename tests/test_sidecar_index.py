@@ -0,0 +1,40 @@
+"""Subtitle-to-video assignment in SidecarIndex."""
+
+import pytest
+
+from sidecar_index import SidecarIndex
+
+VIDEOS = ['Alien.mkv', 'Alien.Resurrection.mkv', 'Film.mkv']
+
+
+def owner(subtitle, videos=VIDEOS):
+    index = SidecarIndex('/nonexistent', names=videos + [subtitle])
+    return next((video for video in videos if subtitle in index.sidecar_names(video)), None)
+
+
+@pytest.mark.parametrize('subtitle, video', [
+    ('Film.srt', 'Film.mkv'),
+    ('film.SRT', 'Film.mkv'),
+    ('Film.en.srt', 'Film.mkv'),
+    ('Film.en.forced.srt', 'Film.mkv'),
+    ('Film.eng.sdh.srt', 'Film.mkv'),
+    ('Film.pt-BR.srt', 'Film.mkv'),
+    ('Film.2.srt', 'Film.mkv'),
+    ('Film_eng.srt', 'Film.mkv'),
+    ('Film - English.srt', 'Film.mkv'),
+    ('Alien.Resurrection.srt', 'Alien.Resurrection.mkv'),
+    ('Alien.Resurrection.en.srt', 'Alien.Resurrection.mkv'),
+    ('Alien.en.srt', 'Alien.mkv'),
+])
+def test_owner(subtitle, video):
+    assert owner(subtitle) == video
+
+
+@pytest.mark.parametrize('subtitle', [
+    'Alien.Resurrection.srt',      # another film's subtitle, its video is not here
+    'Alien.Covenant.en.srt',
+    'Filmography.srt',
+    'Film.Director.Commentary.srt',
+])
+def test_title_components_are_not_stripped(subtitle):
+    assert owner(subtitle, videos=['Alien.mkv', 'Film.mkv']) is None
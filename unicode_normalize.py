@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Recursive Unicode normalization engine shared by the Unicode fixer scripts.
+
+- plan_renames walks a tree once with scandir, at any depth, and returns
+  one rename per name that changes under the target form (NFD for macOS,
+  or NFC to go back).
+- needs_normalization decides that without building normalized strings:
+  ASCII names are skipped outright and the rest go through
+  unicodedata.is_normalized (see benchmark_normalization.py).
+- Every listing is indexed by normalized name in the same pass, so NFC/NFD
+  twins and other names that only differ in form are found in linear time
+  (collision_groups), without asking the filesystem whether a target
+  exists; normalization-insensitive shares answer that ambiguously.
+- ordered_renames / apply_renames apply a plan bottom-up (deepest first), so
+  every planned path is still valid when its turn comes: children are
+  renamed while their parent still has its original name.
+- With workers > 1, director subtrees are planned and applied concurrently
+  (bounded pool, strict bottom-up order inside each subtree), which hides
+  per-request latency on SMB shares.
+
+Each rename is a dict:
+    original, normalized   old and new name
+    directory              parent directory (as it is on disk when planned)
+    src, dst               full old and new path
+    is_dir                 whether the entry is a directory
+    depth                  0 for entries directly in the root
+    subtree                path of the root entry this one is under (itself at depth 0)
+    target_exists          the normalized name is already present in directory
+    twins                  {name: is_dir} of the other entries in directory that
+                           normalize to the same name (empty if none)
+    listing                set of all names in directory when planned (shared)
+"""
+
+import os
+import sys
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional, Tuple
+
+FORMS = ('NFD', 'NFC')
+
+
+def normalize_name(name: str, form: str = 'NFD') -> str:
+    return unicodedata.normalize(form, name)
+
+
+def needs_normalization(name: str, form: str = 'NFD') -> bool:
+    """True if name changes under form. ASCII names never do."""
+    if name.isascii():
+        return False
+    return not unicodedata.is_normalized(form, name)
+
+
+def _scan_directory(directory: str, depth: int, subtree: Optional[str], form: str,
+                    include_hidden: bool, max_depth: Optional[int]):
+    """List one directory. Returns (renames planned in it, subdirectories to walk)."""
+    plan = []
+    subdirs = []
+    try:
+        with os.scandir(directory) as it:
+            entries = list(it)
+    except OSError as e:
+        print(f"  ✗ Cannot list {directory}: {e}", file=sys.stderr)
+        return plan, subdirs
+
+    listing = {entry.name for entry in entries}
+    by_normalized = defaultdict(dict)  # normalized name -> {name: is_dir}
+    pending = []
+    for entry in entries:
+        name = entry.name
+        if not include_hidden and name.startswith('.'):
+            continue
+        try:
+            is_dir = entry.is_dir(follow_symlinks=False)
+        except OSError:
+            is_dir = False
+
+        normalized = name
+        if needs_normalization(name, form):
+            normalized = normalize_name(name, form)
+            pending.append((entry, normalized, is_dir))
+        by_normalized[normalized][name] = is_dir
+        if is_dir and (max_depth is None or depth < max_depth):
+            subdirs.append((entry.path, depth + 1, subtree or entry.path))
+
+    for entry, normalized, is_dir in pending:
+        group = by_normalized[normalized]
+        plan.append({
+            'original': entry.name,
+            'normalized': normalized,
+            'directory': directory,
+            'src': entry.path,
+            'dst': os.path.join(directory, normalized),
+            'is_dir': is_dir,
+            'depth': depth,
+            'subtree': subtree or entry.path,
+            'target_exists': normalized in group,
+            'twins': {name: twin_is_dir for name, twin_is_dir in group.items() if name != entry.name},
+            'listing': listing,
+        })
+    return plan, subdirs
+
+
+def _plan_tree(start, form, include_hidden, max_depth) -> List[Dict]:
+    plan = []
+    stack = [start]
+    while stack:
+        ops, subdirs = _scan_directory(*stack.pop(), form, include_hidden, max_depth)
+        plan.extend(ops)
+        stack.extend(subdirs)
+    return plan
+
+
+def plan_renames(root: str, form: str = 'NFD', include_hidden: bool = False,
+                 max_depth: Optional[int] = None, workers: int = 1) -> List[Dict]:
+    """
+    Plan renames to `form` for every entry below root.
+
+    Each directory is listed exactly once. Hidden entries (and everything
+    below hidden directories) are ignored unless include_hidden is set.
+    With workers > 1 the subtrees of root's entries are walked concurrently.
+    """
+    if form not in FORMS:
+        raise ValueError(f"unsupported normalization form: {form}")
+    plan, subdirs = _scan_directory(root, 0, None, form, include_hidden, max_depth)
+    if workers <= 1:
+        for start in subdirs:
+            plan.extend(_plan_tree(start, form, include_hidden, max_depth))
+        return plan
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for subtree_plan in executor.map(lambda start: _plan_tree(start, form, include_hidden, max_depth),
+                                         subdirs):
+            plan.extend(subtree_plan)
+    return plan
+
+
+def collision_groups(plan: List[Dict]) -> Dict[Tuple[str, str], List[Dict]]:
+    """
+    (directory, normalized name) -> planned renames that collide there.
+
+    Only groups with a collision are returned: an entry already holds the
+    target name, or several entries normalize to it.
+    """
+    groups = defaultdict(list)
+    for op in plan:
+        if op['twins']:
+            groups[(op['directory'], op['normalized'])].append(op)
+    return dict(groups)
+
+
+def ordered_renames(plan: List[Dict]) -> List[Dict]:
+    """Plan in a safe order: deepest first, so parents are renamed last."""
+    return sorted(plan, key=lambda op: (-op['depth'], op['src']))
+
+
+def rename_entry(op: Dict, dry_run: bool = False):
+    """
+    Default action: a plain rename.
+
+    Refuses when another entry already has or will get the normalized name,
+    since a rename would replace it; merge_normalize_unicode merges those.
+    """
+    if op['twins']:
+        raise FileExistsError(f"{op['normalized']} already exists; merge with merge_normalize_unicode.py")
+    if not dry_run:
+        os.rename(op['src'], op['dst'])
+
+
+def print_progress(done: int, total: int):
+    """progress callback for apply_renames that keeps one status line updated."""
+    if done != total and done % max(1, total // 100):
+        return  # about 100 updates per run
+    end = '\n' if done == total else ''
+    print(f"\r  {done}/{total} director folder(s) done", end=end, file=sys.stderr, flush=True)
+
+
+def _apply_in_order(plan, action, dry_run):
+    succeeded = 0
+    failures = []
+    for op in ordered_renames(plan):
+        try:
+            action(op, dry_run)
+            succeeded += 1
+        except OSError as e:
+            failures.append((op, e))
+    return succeeded, failures
+
+
+def apply_renames(plan: List[Dict], action: Callable[[Dict, bool], None] = rename_entry,
+                  dry_run: bool = False, workers: int = 1,
+                  progress: Optional[Callable[[int, int], None]] = None
+                  ) -> Tuple[int, List[Tuple[Dict, Exception]]]:
+    """
+    Run action on every planned rename, bottom-up.
+
+    With workers > 1, the subtrees below root's entries (director folders)
+    are processed concurrently, each strictly bottom-up; the entries of
+    root itself are renamed or merged last, once every subtree is done.
+    progress(done, total) is called as subtrees finish.
+
+    Returns (number succeeded, [(op, error)]). A failure does not stop the
+    rest of the plan.
+    """
+    if workers <= 1:
+        return _apply_in_order(plan, action, dry_run)
+
+    top_level = []
+    subtrees = defaultdict(list)
+    for op in plan:
+        if op['depth'] == 0:
+            top_level.append(op)
+        else:
+            subtrees[op['subtree']].append(op)
+
+    succeeded = 0
+    failures = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_apply_in_order, ops, action, dry_run) for ops in subtrees.values()]
+        for done, future in enumerate(as_completed(futures), 1):
+            subtree_succeeded, subtree_failures = future.result()
+            succeeded += subtree_succeeded
+            failures.extend(subtree_failures)
+            if progress is not None:
+                progress(done, len(futures))
+
+    top_succeeded, top_failures = _apply_in_order(top_level, action, dry_run)
+    return succeeded + top_succeeded, failures + top_failures